@@ -12,6 +12,12 @@ import yaml
 from typing import Dict, List, Optional, Any, Union
 from jinja2 import Environment, FileSystemLoader
 
+# libyamlが利用可能であればC実装のLoader/Dumperを使用（yaml.__with_libyaml__）
+try:
+    from yaml import CSafeLoader as _SafeLoader, CSafeDumper as _SafeDumper
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader, SafeDumper as _SafeDumper
+
 
 class ParameterDefinition:
     """パラメータ定義を管理するクラス"""
@@ -396,7 +402,8 @@ class YAMLSerializer:
             file_path: 保存先のファイルパス
         """
         with open(file_path, 'w', encoding='utf-8') as f:
-            yaml.dump(project.to_dict(), f, default_flow_style=False, sort_keys=False)
+            yaml.dump(project.to_dict(), f, Dumper=_SafeDumper,
+                      default_flow_style=False, sort_keys=False)
     
     @staticmethod
     def load_yaml(file_path: str) -> ProjectStructure:
@@ -410,7 +417,7 @@ class YAMLSerializer:
             読み込まれたプロジェクト構造
         """
         with open(file_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
+            data = yaml.load(f, Loader=_SafeLoader)
         
         return ProjectStructure.from_dict(data)
 
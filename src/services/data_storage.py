@@ -15,10 +15,48 @@ from typing import Dict, List, Optional, Any, Union
 from pathlib import Path
 import tempfile
 
+# orjsonが利用可能であれば高速なJSONシリアライザを使用
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
 
+def _dumps_json(data: Any) -> bytes:
+    """
+    データをUTF-8のJSONバイト列に変換します（orjsonがあれば使用）
+    
+    datetimeやdataclassはorjsonでも変換せずjsonと同じくエラーとし、
+    orjsonが扱えない値（64ビットを超える整数など）はjsonで変換し直します。
+    ただし、orjsonがある場合はUUIDとEnumも変換され、NaNと無限大はnullになります。
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                data,
+                option=(orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+                        | orjson.OPT_PASSTHROUGH_DATETIME
+                        | orjson.OPT_PASSTHROUGH_DATACLASS
+                        | orjson.OPT_PASSTHROUGH_SUBCLASS),
+            )
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def _loads_json(raw: bytes) -> Any:
+    """
+    JSONバイト列をデータに変換します
+    
+    orjsonは64ビットを超える整数を浮動小数点数として読み込み値が変わるため、
+    読み込みには常にjsonを使用します。
+    """
+    return json.loads(raw)
+
+
 class DataStorageService:
     """データ永続化機能を提供するクラス"""
     
@@ -399,8 +437,8 @@ class DataStorageService:
         
         try:
             # データの保存
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with open(cache_file, 'wb') as f:
+                f.write(_dumps_json(data))
             
             return True
         except Exception as e:
@@ -425,8 +463,8 @@ class DataStorageService:
         
         try:
             # データの読み込み
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(cache_file, 'rb') as f:
+                return _loads_json(f.read())
         except Exception as e:
             logger.error(f"キャッシュ読み込みエラー: {str(e)}")
             return None
@@ -540,4 +578,11 @@ class DataStorageService:
                 
                 # プロジェクトディレクトリのコピー
                 shutil.copytree(
-                    os.path.j<response clipped><NOTE>To save on context only part of this file has been shown to you. You should retry this tool after you have searched inside the file with `grep -n` in order to find the line numbers of what you are looking for.</NOTE>
\ No newline at end of file
+                    os.path.join(temp_dir, project_name),
+                    project_dir
+                )
+            
+            return project_name
+        except Exception as e:
+            logger.error(f"バックアップ復元エラー: {str(e)}")
+            return None
@@ -9,14 +9,63 @@ LLMレスポンスの解析などの機能を実装しています。
 
 import json
 import logging
+import string
 import time
-from typing import Dict, List, Any, Optional, Union
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, List, Any, Optional, Tuple, Union
 import requests
 from requests.exceptions import RequestException
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
+_FORMATTER = string.Formatter()
+
+
+@lru_cache(maxsize=256)
+def _parse_template(template: str) -> Optional[Tuple[Tuple[str, Optional[str]], ...]]:
+    """
+    テンプレート文字列を (リテラル, フィールド名) の列に分解します。
+    
+    分解結果はテンプレート文字列ごとにキャッシュされます。
+    
+    Args:
+        template: テンプレート文字列
+        
+    Returns:
+        分解結果。書式指定や属性参照などを含み単純に置換できない場合はNone
+        
+    Raises:
+        ValueError: テンプレートの書式が不正な場合
+    """
+    pieces = []
+    for literal, field, spec, conversion in _FORMATTER.parse(template):
+        if field is not None and (not field.isidentifier() or spec or conversion):
+            return None
+        pieces.append((literal, field))
+    return tuple(pieces)
+
+
+def _format_template(template: str, kwargs: Dict[str, Any]) -> str:
+    """
+    テンプレートに変数を埋め込みます（str.formatと同じ結果を返します）。
+    
+    Args:
+        template: テンプレート文字列
+        kwargs: テンプレートに埋め込む変数
+        
+    Returns:
+        変数を埋め込んだ文字列
+    """
+    pieces = _parse_template(template)
+    if pieces is None:
+        return template.format(**kwargs)
+    return "".join([
+        literal if field is None else literal + format(kwargs[field])
+        for literal, field in pieces
+    ])
+
 
 class LLMConnector:
     """OpenAI Compatible APIとの通信を行うクラス"""
@@ -273,7 +322,7 @@ class PromptGenerator:
             raise ValueError(f"テンプレート '{template_name}' が見つかりません")
         
         template = self.templates[template_name]
-        return template.format(**kwargs)
+        return _format_template(template, kwargs)
     
     def generate_custom_prompt(self, base_prompt: str, **kwargs) -> str:
         """
@@ -286,7 +335,7 @@ class PromptGenerator:
         Returns:
             生成されたプロンプト
         """
-        return base_prompt.format(**kwargs)
+        return _format_template(base_prompt, kwargs)
 
 
 class ResponseParser:
@@ -333,16 +382,12 @@ class ResponseParser:
         Raises:
             json.JSONDecodeError: JSON解析エラーの場合
         """
-        # コードブロックからJSONを抽出
+        # コードブロックからJSONを抽出（最初のブロックだけを切り出す）
         json_text = text
         if "```json" in text:
-            parts = text.split("```json")
-            if len(parts) > 1:
-                json_text = parts[1].split("```")[0].strip()
+            json_text = text.partition("```json")[2].partition("```")[0].strip()
         elif "```" in text:
-            parts = text.split("```")
-            if len(parts) > 1:
-                json_text = parts[1].strip()
+            json_text = text.partition("```")[2].partition("```")[0].strip()
         
         try:
             return json.loads(json_text)
@@ -364,10 +409,8 @@ class ResponseParser:
         """
         code_marker = f"```{language}"
         if code_marker in text:
-            parts = text.split(code_marker)
-            if len(parts) > 1:
-                code = parts[1].split("```")[0].strip()
-                return code
+            # 最初のコードブロックだけを切り出す
+            return text.partition(code_marker)[2].partition("```")[0].strip()
         
         # コードブロックが見つからない場合は、テキスト全体を返す
         return text
@@ -388,8 +431,20 @@ class LLMService:
         self.connector = LLMConnector(api_base_url, api_key, model)
         self.prompt_generator = PromptGenerator()
         self.response_parser = ResponseParser()
-        self.conversation_history: List[Dict[str, str]] = []
-        self.max_history_length = 10
+        # 上限を超えた古いメッセージはdequeが自動的に捨てる
+        self._max_history_length = 10
+        self.conversation_history: Deque[Dict[str, str]] = deque(
+            maxlen=self._max_history_length * 2)
+    
+    @property
+    def max_history_length(self) -> int:
+        """保持する会話の往復数"""
+        return self._max_history_length
+    
+    @max_history_length.setter
+    def max_history_length(self, value: int) -> None:
+        self._max_history_length = value
+        self.conversation_history = deque(self.conversation_history, maxlen=value * 2)
     
     def generate_text(self, prompt: str, max_tokens: int = 1000, 
                      temperature: float = 0.7) -> str:
@@ -451,14 +506,11 @@ class LLMService:
             # レスポンスからテキストを抽出
             response_text = self.response_parser.extract_text(response)
             
-            # 会話履歴を更新
-            self.conversation_history.append({"role": "user", "content": user_message})
-            self.conversation_history.append({"role": "assistant", "content": response_text})
-            
-            # 履歴が長すぎる場合は古いものを削除
-            while len(self.conversation_history) > self.max_history_length * 2:
-                self.conversation_history.pop(0)
-                self.conversation_history.pop(0)
+            # 会話履歴を更新（上限を超えた分はdequeが先頭から削除する）
+            self.conversation_history.extend((
+                {"role": "user", "content": user_message},
+                {"role": "assistant", "content": response_text},
+            ))
             
             return response_text
         except Exception as e:
@@ -9,6 +9,7 @@ Webブラウザの操作、テキストエディタの操作、ファイルシ
 
 import os
 import re
+import mmap
 import time
 import logging
 import subprocess
@@ -39,6 +40,11 @@ logger = logging.getLogger(__name__)
 class BrowserController:
     """Webブラウザの操作を行うクラス"""
     
+    # 引数で値を渡す定数スクリプト（呼び出しごとの文字列生成を避ける）
+    _SCROLL_JS = "window.scrollTo(arguments[0], arguments[1]);"
+    _SCROLL_INTO_VIEW_JS = "arguments[0].scrollIntoView(true);"
+    _CLICK_JS = "arguments[0].click();"
+    
     def __init__(self, headless: bool = False, browser_type: str = "chrome"):
         """
         BrowserControllerを初期化します。
@@ -54,6 +60,25 @@ class BrowserController:
         self.headless = headless
         self.driver = None
         self.wait_timeout = 10  # 要素待機のデフォルトタイムアウト（秒）
+        self._locator_cache: Dict[Tuple[str, str], Any] = {}  # (by, selector) -> 待機条件
+    
+    def _locator(self, selector: str, by: str) -> Any:
+        """
+        要素の存在待機条件を取得します。同じセレクタの条件は再利用します。
+        
+        Args:
+            selector: 要素のセレクタ
+            by: 検索方法
+            
+        Returns:
+            presence_of_element_locatedの待機条件
+        """
+        key = (by, selector)
+        locator = self._locator_cache.get(key)
+        if locator is None:
+            locator = EC.presence_of_element_located(key)
+            self._locator_cache[key] = locator
+        return locator
     
     def start_browser(self) -> bool:
         """
@@ -171,7 +196,7 @@ class BrowserController:
         try:
             if wait:
                 element = WebDriverWait(self.driver, self.wait_timeout).until(
-                    EC.presence_of_element_located((by, selector))
+                    self._locator(selector, by)
                 )
                 return element
             else:
@@ -228,7 +253,7 @@ class BrowserController:
             
             # JavaScriptを使用して強制的にクリック
             try:
-                self.driver.execute_script("arguments[0].click();", element)
+                self.driver.execute_script(self._CLICK_JS, element)
                 return True
             except Exception as js_e:
                 logger.error(f"JavaScriptクリックエラー: {str(js_e)}")
@@ -322,7 +347,7 @@ class BrowserController:
             return False
         
         try:
-            self.driver.execute_script(f"window.scrollTo({x}, {y});")
+            self.driver.execute_script(self._SCROLL_JS, x, y)
             return True
         except Exception as e:
             logger.error(f"スクロールエラー: {str(e)}")
@@ -344,7 +369,7 @@ class BrowserController:
             return False
         
         try:
-            self.driver.execute_script("arguments[0].scrollIntoView(true);", element)
+            self.driver.execute_script(self._SCROLL_INTO_VIEW_JS, element)
             return True
         except Exception as e:
             logger.error(f"要素へのスクロールエラー: {str(e)}")
@@ -370,9 +395,7 @@ class BrowserController:
             timeout = self.wait_timeout
         
         try:
-            WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_element_located((by, selector))
-            )
+            WebDriverWait(self.driver, timeout).until(self._locator(selector, by))
             return True
         except TimeoutException:
             logger.warning(f"要素待機タイムアウト: {selector}")
@@ -451,38 +474,42 @@ class EditorController:
         Returns:
             編集後のコンテンツ、キャンセルまたはエラーの場合はNone
         """
-        temp_path = self.create_temp_file(content, suffix)
-        if not temp_path:
-            return None
-        
+        temp_path = None
         try:
+            # 一時ファイルを一度だけ開いて初期内容を書き込む
+            with tempfile.NamedTemporaryFile(mode='w+', suffix=suffix, delete=False,
+                                             encoding='utf-8') as tf:
+                temp_path = tf.name
+                tf.write(content)
+                tf.flush()
+            
             # エディタでファイルを開く
-            if not self.open_file(temp_path):
-                return None
+            subprocess.run([self.editor_command, temp_path], check=True)
             
             # 編集後のコンテンツを読み込む
-            with open(temp_path, 'r') as f:
-                edited_content = f.read()
-            
-            # 一時ファイルを削除
-            os.unlink(temp_path)
-            
-            return edited_content
+            with open(temp_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except subprocess.CalledProcessError as e:
+            logger.error(f"エディタ起動エラー: {str(e)}")
+            return None
         except Exception as e:
             logger.error(f"コンテンツ編集エラー: {str(e)}")
-            
-            # エラー時も一時ファイルを削除
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
-            
             return None
+        finally:
+            # 成功・失敗に関わらず一時ファイルを削除
+            if temp_path:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
 
 
 class FileSystemController:
     """ファイルシステムの操作を行うクラス"""
     
+    # このサイズを超えるファイルはmmap経由で読み込む（バイト）
+    MMAP_THRESHOLD = 10 * 1024 * 1024
+    
     def read_file(self, file_path: str) -> Optional[str]:
         """
         ファイルの内容を読み込みます。
@@ -494,16 +521,25 @@ class FileSystemController:
             ファイルの内容、エラーの場合はNone
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            size = os.path.getsize(file_path)
+        except Exception as e:
+            logger.error(f"ファイル読み込みエラー: {str(e)}")
+            return None
+        
+        try:
+            if size > self.MMAP_THRESHOLD:
+                # 大きなファイルはmmapから直接デコードし、読み込みバッファのコピーを省く
+                with open(file_path, 'rb') as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        text = str(mm, 'utf-8')
+                # テキストモードと同じく改行コード（CRLF/CR）をLFに揃える
+                return text.replace('\r\n', '\n').replace('\r', '\n')
+            
+            with open(file_path, 'r', encoding='utf-8', buffering=max(8192, size)) as f:
                 return f.read()
         except UnicodeDecodeError:
-            # バイナリファイルの場合はバイナリモードで読み込み
-            try:
-                with open(file_path, 'rb') as f:
-                    return f"<バイナリファイル: {len(f.read())} バイト>"
-            except Exception as e:
-                logger.error(f"バイナリファイル読み込みエラー: {str(e)}")
-                return None
+            # バイナリファイルの場合は再読み込みせずにサイズのみ返す
+            return f"<バイナリファイル: {size} バイト>"
         except Exception as e:
             logger.error(f"ファイル読み込みエラー: {str(e)}")
             return None
@@ -7,6 +7,11 @@ Arna - Code Editor
 コードの編集、シンタックスハイライト、自動補完などの機能を実装します。
 """
 
+import os
+import threading
+from functools import partial
+from pathlib import Path
+from kivy.app import App
 from kivy.uix.codeinput import CodeInput
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
@@ -14,25 +19,26 @@ from kivy.uix.button import Button
 from kivy.properties import StringProperty, BooleanProperty
 from kivy.metrics import dp
 from kivy.lang import Builder
-from pygments.lexers import PythonLexer
+from kivy.clock import Clock
 
 # 自作モジュールのインポート
 from src.ui.theme import SwedishMinimalistTheme
+from src.ui.file_io import write_text_file
 
-# KVファイルの読み込み
-Builder.load_string('''
+# KV定義（テーマの定数はロード時に埋め込む）
+KV = '''
 #:kivy 2.0.0
 
 <CodeEditor>:
-    background_color: app.theme.colors.OFF_WHITE
-    foreground_color: app.theme.colors.DARK_GREY
-    font_name: app.theme.FONT_FAMILY_MONO
-    font_size: app.theme.FONT_SIZE_BODY
-    padding: [app.theme.PADDING_MEDIUM, app.theme.PADDING_MEDIUM]
+    background_color: {OFF_WHITE}
+    foreground_color: {DARK_GREY}
+    font_name: {FONT_FAMILY_MONO}
+    font_size: {FONT_SIZE_BODY}
+    padding: [{PADDING_MEDIUM}, {PADDING_MEDIUM}]
     
     canvas.before:
         Color:
-            rgba: app.theme.colors.OFF_WHITE
+            rgba: {OFF_WHITE}
         Rectangle:
             pos: self.pos
             size: self.size
@@ -40,12 +46,12 @@ Builder.load_string('''
 <CodeEditorToolbar>:
     orientation: 'horizontal'
     size_hint_y: None
-    height: app.theme.TOOLBAR_HEIGHT
-    padding: [app.theme.PADDING_MEDIUM, app.theme.PADDING_SMALL]
-    spacing: app.theme.PADDING_MEDIUM
+    height: {TOOLBAR_HEIGHT}
+    padding: [{PADDING_MEDIUM}, {PADDING_SMALL}]
+    spacing: {PADDING_MEDIUM}
     canvas.before:
         Color:
-            rgba: app.theme.colors.LIGHT_GREY
+            rgba: {LIGHT_GREY}
         Rectangle:
             pos: self.pos
             size: self.size
@@ -54,37 +60,47 @@ Builder.load_string('''
         text: 'Save'
         size_hint_x: None
         width: dp(80)
-        background_color: app.theme.colors.SWEDISH_BLUE
-        color: app.theme.colors.OFF_WHITE
-        font_name: app.theme.FONT_FAMILY_REGULAR
-        font_size: app.theme.FONT_SIZE_BODY
+        background_color: {SWEDISH_BLUE}
+        color: {OFF_WHITE}
+        font_name: {FONT_FAMILY_REGULAR}
+        font_size: {FONT_SIZE_BODY}
         on_release: root.save_code()
     
     Button:
         text: 'Format'
         size_hint_x: None
         width: dp(80)
-        background_color: app.theme.colors.SWEDISH_BLUE
-        color: app.theme.colors.OFF_WHITE
-        font_name: app.theme.FONT_FAMILY_REGULAR
-        font_size: app.theme.FONT_SIZE_BODY
+        background_color: {SWEDISH_BLUE}
+        color: {OFF_WHITE}
+        font_name: {FONT_FAMILY_REGULAR}
+        font_size: {FONT_SIZE_BODY}
         on_release: root.format_code()
     
     Button:
         text: 'Run'
         size_hint_x: None
         width: dp(80)
-        background_color: app.theme.colors.SWEDISH_BLUE
-        color: app.theme.colors.OFF_WHITE
-        font_name: app.theme.FONT_FAMILY_REGULAR
-        font_size: app.theme.FONT_SIZE_BODY
+        background_color: {SWEDISH_BLUE}
+        color: {OFF_WHITE}
+        font_name: {FONT_FAMILY_REGULAR}
+        font_size: {FONT_SIZE_BODY}
         on_release: root.run_code()
     
+    Button:
+        text: 'Highlight'
+        size_hint_x: None
+        width: dp(80)
+        background_color: {SWEDISH_BLUE}
+        color: {OFF_WHITE}
+        font_name: {FONT_FAMILY_REGULAR}
+        font_size: {FONT_SIZE_BODY}
+        on_release: root.toggle_highlight()
+    
     Label:
         text: root.status_text
-        color: app.theme.colors.DARK_GREY
-        font_name: app.theme.FONT_FAMILY_REGULAR
-        font_size: app.theme.FONT_SIZE_SMALL
+        color: {DARK_GREY}
+        font_name: {FONT_FAMILY_REGULAR}
+        font_size: {FONT_SIZE_SMALL}
         text_size: self.size
         halign: 'right'
         valign: 'middle'
@@ -98,7 +114,95 @@ Builder.load_string('''
     
     CodeEditor:
         id: editor
-''')
+'''
+
+# KVの読み込み（モジュールが再読み込みされても二重に解析しない）
+KV_FILENAME = 'code_editor.kv'
+if KV_FILENAME not in Builder.files:
+    Builder.load_string(KV.format(**SwedishMinimalistTheme.kv_constants()), filename=KV_FILENAME)
+
+
+def _read_text_file(file_path):
+    """
+    UTF-8のテキストファイルを読み込みます。UIスレッド以外からも呼び出せます。
+    
+    Args:
+        file_path: 読み込むファイルのパス
+        
+    Returns:
+        ファイルの内容
+    """
+    # バイト列として一度に読み込み、TextIOWrapperを介さずまとめてデコードする
+    # テキストモードと同じく、改行コード（CRLF/CR）はLFに揃える
+    text = Path(file_path).read_bytes().decode('utf-8')
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+# ツールバーのステータスメッセージ
+_STATUS_SAVED_PREFIX = "保存しました: "
+_STATUS_SAVE_FAILED = "保存に失敗しました"
+_STATUS_FORMATTING = "コードを整形しています..."
+_STATUS_FORMATTED = "コードを整形しました"
+_STATUS_FORMAT_FAILED = "コード整形に失敗しました"
+_STATUS_HIGHLIGHT_ON = "ハイライトを有効にしました"
+_STATUS_HIGHLIGHT_OFF = "ハイライトを無効にしました"
+_STATUS_RUNNING_PREFIX = "実行中: "
+_STATUS_RUN_UNAVAILABLE = "実行機能が利用できません"
+_STATUS_LOADED_PREFIX = "読み込みました: "
+_STATUS_LOAD_FAILED = "読み込みに失敗しました"
+_STATUS_LOADING_PREFIX = "読み込み中: "
+
+
+# Pygmentsのレキサーは初回使用時にインポートし、全エディタで1つのインスタンスを共有する
+_PYTHON_LEXER = None
+_TEXT_LEXER = None
+
+
+def _get_python_lexer():
+    """共有のPythonレキサーを取得します"""
+    global _PYTHON_LEXER
+    if _PYTHON_LEXER is None:
+        from pygments.lexers.python import PythonLexer
+        _PYTHON_LEXER = PythonLexer()
+    return _PYTHON_LEXER
+
+
+def _get_text_lexer():
+    """ハイライトなし用の共有プレーンテキストレキサーを取得します"""
+    global _TEXT_LEXER
+    if _TEXT_LEXER is None:
+        from pygments.lexers.special import TextLexer
+        _TEXT_LEXER = TextLexer()
+    return _TEXT_LEXER
+
+
+# Blackのモードは不変のため一度だけ生成して使い回す
+_BLACK_MODE = None
+
+
+def _run_black(text):
+    """
+    Blackでコードを整形します。UIスレッド以外からも呼び出せます。
+    
+    Args:
+        text: 整形するコード
+        
+    Returns:
+        整形後のコード、失敗した場合はNone
+    """
+    global _BLACK_MODE
+    try:
+        import black
+        
+        if _BLACK_MODE is None:
+            _BLACK_MODE = black.FileMode()
+        return black.format_str(text, mode=_BLACK_MODE)
+    except ImportError:
+        print("blackがインストールされていません。pip install blackを実行してください。")
+        return None
+    except Exception as e:
+        print(f"コード整形エラー: {str(e)}")
+        return None
 
 
 class CodeEditor(CodeInput):
@@ -106,19 +210,80 @@ class CodeEditor(CodeInput):
     
     file_path = StringProperty('')
     is_modified = BooleanProperty(False)
+    highlight_enabled = BooleanProperty(True)
+    
+    # この文字数を超えるファイルはシンタックスハイライトを無効にして読み込む
+    HIGHLIGHT_MAX_CHARS = 64 * 1024
     
     def __init__(self, **kwargs):
-        # デフォルトでPythonレキサーを使用
-        kwargs['lexer'] = PythonLexer()
+        # (フォント名, フォントサイズ) -> 1文字あたりの幅
+        # 親クラスの初期化中にもレイアウトが走るため先に用意する
+        self._glyph_w_cache = {}
+        
+        # (整形前テキストのハッシュ, 整形結果) 直前の整形結果を再利用するためのキャッシュ
+        self._fmt_cache = (None, None)
+        
+        # デフォルトで共有のPythonレキサーを使用（呼び出し側の指定を優先）
+        kwargs.setdefault('lexer', _get_python_lexer())
         super(CodeEditor, self).__init__(**kwargs)
         
+        # 保存は発行順に番号を付け、ロックの下で古い保存が新しい保存を上書きしないようにする
+        self._save_lock = threading.Lock()
+        self._save_seq = 0
+        self._written_seq = {}  # ファイルパス -> 書き込み済みの最新の保存番号
+        
+        # テキスト変更の通知は最大100msに1回にまとめる
+        self._changed_trigger = Clock.create_trigger(self._flush_changed, 0.1)
+        
         # テキスト変更時のコールバックを設定
         self.bind(text=self.on_text_changed)
     
     def on_text_changed(self, instance, value):
         """テキストが変更されたときのコールバック"""
+        self._changed_trigger()
+    
+    def _flush_changed(self, dt=None):
+        """まとめたテキスト変更を反映します"""
         self.is_modified = True
     
+    def flush_pending_changes(self):
+        """保留中のテキスト変更通知を即座に反映します"""
+        if self._changed_trigger.is_triggered:
+            self._changed_trigger.cancel()
+            self._flush_changed()
+    
+    def _mark_unmodified(self):
+        """保留中の変更通知を破棄し、未変更状態にします"""
+        self._changed_trigger.cancel()
+        self.is_modified = False
+    
+    def _get_text_width(self, text, tab_width, _label_cached):
+        """
+        テキストの描画幅を返します。
+        
+        等幅フォントでASCIIのみのテキストは全グリフの幅が等しいため、
+        キャッシュした1文字分の幅から計算してラベルの計測を省きます。
+        """
+        if self.font_name != SwedishMinimalistTheme.FONT_FAMILY_MONO or not text.isascii():
+            return super(CodeEditor, self)._get_text_width(text, tab_width, _label_cached)
+        
+        key = (self.font_name, self.font_size)
+        char_width = self._glyph_w_cache.get(key)
+        if char_width is None:
+            char_width = super(CodeEditor, self)._get_text_width(' ', tab_width, _label_cached)
+            self._glyph_w_cache[key] = char_width
+        
+        # タブはtab_width個の空白として計算する
+        return (len(text) + text.count('\t') * (tab_width - 1)) * char_width
+    
+    def on_highlight_enabled(self, instance, value):
+        """ハイライト設定が変更されたときにレキサーを切り替えます"""
+        self.lexer = _get_python_lexer() if value else _get_text_lexer()
+    
+    def toggle_highlight(self):
+        """シンタックスハイライトの有効・無効を切り替えます"""
+        self.highlight_enabled = not self.highlight_enabled
+    
     def load_file(self, file_path):
         """
         ファイルを読み込みます。
@@ -130,15 +295,55 @@ class CodeEditor(CodeInput):
             読み込みに成功したかどうか
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                self.text = f.read()
-            
-            self.file_path = file_path
-            self.is_modified = False
-            return True
+            text = _read_text_file(file_path)
         except Exception as e:
             print(f"ファイル読み込みエラー: {str(e)}")
             return False
+        
+        self._apply_loaded_text(file_path, text)
+        return True
+    
+    def load_file_async(self, file_path, callback=None):
+        """
+        ファイルをバックグラウンドスレッドで読み込みます。
+        
+        ディスクI/O中もUIスレッドをブロックしません。読み込んだ内容は
+        メインスレッドでエディタに反映され、callbackに成功したかどうかが渡されます。
+        
+        Args:
+            file_path: 読み込むファイルのパス
+            callback: 読み込み完了時に呼び出される関数（引数は成功したかどうか）
+        """
+        threading.Thread(
+            target=self._load_worker,
+            args=(file_path, callback),
+            daemon=True
+        ).start()
+    
+    def _load_worker(self, file_path, callback):
+        """バックグラウンドでファイルを読み込み、結果をメインスレッドに渡します"""
+        try:
+            text = _read_text_file(file_path)
+        except Exception as e:
+            print(f"ファイル読み込みエラー: {str(e)}")
+            text = None
+        Clock.schedule_once(partial(self._on_load_finished, file_path, text, callback))
+    
+    def _on_load_finished(self, file_path, text, callback, dt):
+        """メインスレッドで読み込み結果をエディタに反映します"""
+        if text is not None:
+            self._apply_loaded_text(file_path, text)
+        if callback:
+            callback(text is not None)
+    
+    def _apply_loaded_text(self, file_path, text):
+        """読み込んだテキストをエディタに設定します"""
+        # 大きなファイルはキー入力ごとの再トークン化を避けるためハイライトを切る
+        self.highlight_enabled = len(text) <= self.HIGHLIGHT_MAX_CHARS
+        self.text = text
+        
+        self.file_path = file_path
+        self._mark_unmodified()
     
     def save_file(self, file_path=None):
         """
@@ -156,16 +361,92 @@ class CodeEditor(CodeInput):
             return False
         
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(self.text)
+            self._write_in_order(file_path, self.text, self._next_save_seq())
             
             self.file_path = file_path
-            self.is_modified = False
+            self._mark_unmodified()
             return True
         except Exception as e:
             print(f"ファイル保存エラー: {str(e)}")
             return False
     
+    def save_file_async(self, file_path=None, callback=None):
+        """
+        ファイルをバックグラウンドスレッドで保存します。
+        
+        保存するテキストは呼び出し時点の内容です。保存完了後、
+        callbackに成功したかどうかがメインスレッドで渡されます。
+        
+        Args:
+            file_path: 保存先のファイルパス（省略時は現在のファイルパス）
+            callback: 保存完了時に呼び出される関数（引数は成功したかどうか）
+        """
+        file_path = file_path or self.file_path
+        
+        if not file_path:
+            if callback:
+                callback(False)
+            return
+        
+        threading.Thread(
+            target=self._save_worker,
+            args=(file_path, self.text, self._next_save_seq(), callback),
+            daemon=True
+        ).start()
+    
+    def _next_save_seq(self):
+        """次の保存番号を発行します（メインスレッドから呼び出す）"""
+        self._save_seq += 1
+        return self._save_seq
+    
+    def _write_in_order(self, file_path, text, seq):
+        """
+        保存番号の順にファイルへ書き込みます。
+        
+        スレッドの実行順は保証されないため、同じファイルにより新しい保存が
+        書き込み済みの場合は、古い内容で上書きせずに何もしません。
+        """
+        with self._save_lock:
+            if seq < self._written_seq.get(file_path, 0):
+                return
+            write_text_file(file_path, text)
+            self._written_seq[file_path] = seq
+    
+    def _save_worker(self, file_path, text, seq, callback):
+        """バックグラウンドでファイルを保存し、結果をメインスレッドに渡します"""
+        try:
+            self._write_in_order(file_path, text, seq)
+            success = True
+        except Exception as e:
+            print(f"ファイル保存エラー: {str(e)}")
+            success = False
+        Clock.schedule_once(partial(self._on_save_finished, file_path, text, seq, success, callback))
+    
+    def _on_save_finished(self, file_path, text, seq, success, callback, dt):
+        """メインスレッドで保存結果をエディタに反映します"""
+        if success:
+            self.file_path = file_path
+            # 後から別の保存が発行された場合や、保存中に編集された場合は未保存のままにする
+            if seq == self._save_seq and self.text == text:
+                self._mark_unmodified()
+        if callback:
+            callback(success)
+    
+    def _get_cached_format(self, text, text_hash):
+        """
+        直前の整形結果が再利用できる場合はそれを返します。
+        
+        内容が前回の整形前と同じ、または前回の整形結果のままなら
+        Blackを再実行する必要はありません。
+        
+        Returns:
+            再利用できる整形結果、できない場合はNone
+        """
+        cached_hash, cached_code = self._fmt_cache
+        if text_hash == cached_hash or text == cached_code:
+            return cached_code
+        return None
+    
     def format_code(self):
         """
         コードを整形します。
@@ -173,19 +454,64 @@ class CodeEditor(CodeInput):
         Returns:
             整形に成功したかどうか
         """
-        try:
-            import black
-            
-            # Blackを使用してコードを整形
-            formatted_code = black.format_str(self.text, mode=black.FileMode())
+        text = self.text
+        text_hash = hash(text)
+        formatted_code = self._get_cached_format(text, text_hash)
+        if formatted_code is None:
+            formatted_code = _run_black(text)
+            if formatted_code is None:
+                return False
+            self._fmt_cache = (text_hash, formatted_code)
+        
+        if formatted_code != text:
             self.text = formatted_code
-            return True
-        except ImportError:
-            print("blackがインストールされていません。pip install blackを実行してください。")
-            return False
-        except Exception as e:
-            print(f"コード整形エラー: {str(e)}")
-            return False
+        return True
+    
+    def format_code_async(self, callback=None):
+        """
+        コードをバックグラウンドスレッドで整形します。
+        
+        Blackの実行中もUIスレッドをブロックしません。結果はメインスレッドで
+        エディタに反映され、callbackに整形に成功したかどうかが渡されます。
+        
+        Args:
+            callback: 整形完了時に呼び出される関数（引数は成功したかどうか）
+        """
+        text = self.text
+        text_hash = hash(text)
+        formatted_code = self._get_cached_format(text, text_hash)
+        if formatted_code is not None:
+            if formatted_code != text:
+                self.text = formatted_code
+            if callback:
+                callback(True)
+            return
+        
+        threading.Thread(
+            target=self._format_worker,
+            args=(text, text_hash, callback),
+            daemon=True
+        ).start()
+    
+    def _format_worker(self, text, text_hash, callback):
+        """バックグラウンドでBlackを実行し、結果をメインスレッドに渡します"""
+        formatted_code = _run_black(text)
+        Clock.schedule_once(partial(self._apply_formatted, text, text_hash,
+                                    formatted_code, callback))
+    
+    def _apply_formatted(self, source, text_hash, formatted_code, callback, dt):
+        """メインスレッドで整形結果をエディタに反映します"""
+        success = formatted_code is not None
+        if success:
+            self._fmt_cache = (text_hash, formatted_code)
+            # 整形中に編集された場合はユーザーの入力を上書きしない
+            if self.text == source:
+                self.text = formatted_code
+            else:
+                success = False
+        
+        if callback:
+            callback(success)
 
 
 class CodeEditorToolbar(BoxLayout):
@@ -194,25 +520,49 @@ class CodeEditorToolbar(BoxLayout):
     editor = None
     status_text = StringProperty('')
     
+    def set_status(self, text):
+        """ステータスメッセージを設定します"""
+        self.status_text = text
+    
     def save_code(self):
         """コードを保存します"""
         if not self.editor:
             return
         
-        if self.editor.save_file():
-            self.status_text = f"保存しました: {self.editor.file_path}"
+        self.editor.save_file_async(callback=self._on_save_done)
+    
+    def _on_save_done(self, success):
+        """保存完了時のコールバック"""
+        if success:
+            self.set_status(_STATUS_SAVED_PREFIX + self.editor.file_path)
         else:
-            self.status_text = "保存に失敗しました"
+            self.set_status(_STATUS_SAVE_FAILED)
     
     def format_code(self):
         """コードを整形します"""
         if not self.editor:
             return
         
-        if self.editor.format_code():
-            self.status_text = "コードを整形しました"
+        self.set_status(_STATUS_FORMATTING)
+        self.editor.format_code_async(self._on_format_done)
+    
+    def _on_format_done(self, success):
+        """コード整形完了時のコールバック"""
+        if success:
+            self.set_status(_STATUS_FORMATTED)
+        else:
+            self.set_status(_STATUS_FORMAT_FAILED)
+    
+    def toggle_highlight(self):
+        """シンタックスハイライトを切り替えます"""
+        if not self.editor:
+            return
+        
+        self.editor.toggle_highlight()
+        if self.editor.highlight_enabled:
+            self.set_status(_STATUS_HIGHLIGHT_ON)
         else:
-            self.status_text = "コード整形に失敗しました"
+            self.set_status(_STATUS_HIGHLIGHT_OFF)
     
     def run_code(self):
         """コードを実行します"""
@@ -220,18 +570,19 @@ class CodeEditorToolbar(BoxLayout):
             return
         
         # 実行前に保存
+        self.editor.flush_pending_changes()
         if self.editor.is_modified:
             if not self.editor.save_file():
-                self.status_text = "保存に失敗しました"
+                self.set_status(_STATUS_SAVE_FAILED)
                 return
         
         # 実行はメインアプリケーションに委譲
-        app = self.get_root_window().children[0]
+        app = App.get_running_app()
         if hasattr(app, 'run_code'):
             app.run_code(self.editor.file_path)
-            self.status_text = f"実行中: {self.editor.file_path}"
+            self.set_status(_STATUS_RUNNING_PREFIX + self.editor.file_path)
         else:
-            self.status_text = "実行機能が利用できません"
+            self.set_status(_STATUS_RUN_UNAVAILABLE)
 
 
 class CodeEditorContainer(BoxLayout):
@@ -259,7 +610,23 @@ class CodeEditorContainer(BoxLayout):
         """
         result = self.ids.editor.load_file(file_path)
         if result:
-            self.ids.toolbar.status_text = f"読み込みました: {file_path}"
+            self.ids.toolbar.set_status(_STATUS_LOADED_PREFIX + file_path)
         else:
-            self.ids.toolbar.status_text = "読み込みに失敗しました"
+            self.ids.toolbar.set_status(_STATUS_LOAD_FAILED)
         return result
+    
+    def load_file_async(self, file_path):
+        """
+        ファイルをバックグラウンドスレッドで読み込みます。
+        
+        Args:
+            file_path: 読み込むファイルのパス
+        """
+        def on_loaded(success):
+            if success:
+                self.ids.toolbar.set_status(_STATUS_LOADED_PREFIX + file_path)
+            else:
+                self.ids.toolbar.set_status(_STATUS_LOAD_FAILED)
+        
+        self.ids.toolbar.set_status(_STATUS_LOADING_PREFIX + file_path)
+        self.ids.editor.load_file_async(file_path, on_loaded)
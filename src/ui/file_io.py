@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Arna - File I/O
+
+このモジュールはエディタ間で共有するファイル入出力の補助関数を提供します。
+Kivyに依存しないため、UIスレッド以外からも呼び出せます。
+"""
+
+import os
+import shutil
+import tempfile
+
+
+def write_text_file(file_path, text):
+    """
+    テキストをUTF-8でファイルに書き込みます。UIスレッド以外からも呼び出せます。
+    
+    Args:
+        file_path: 保存先のファイルパス
+        text: 書き込むテキスト
+    """
+    # エンコード済みのバイト列を一時ファイルに書き込み、置き換えで確定する
+    # 書き込み途中で失敗しても元のファイルが壊れないようにする
+    # テキストモードと同じく、改行はプラットフォームの改行コードで書き込む
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    data = text.encode('utf-8')
+    
+    # 一時ファイルは保存ごとに一意な名前で作成する
+    # （連続保存が同じ一時ファイルを共有したり、既存の.tmpファイルを上書きしたりしない）
+    directory, name = os.path.split(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + name, suffix='.tmp')
+    try:
+        # TextIOWrapperやバッファを介さずos.writeで直接書き込む
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        
+        # 既存ファイルのパーミッションを引き継ぐ（新規ファイルはmkstempの0o600を広げる）
+        try:
+            shutil.copymode(file_path, tmp_path)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)
+        
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
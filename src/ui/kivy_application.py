@@ -28,69 +28,69 @@ from src.ui.project_view import ProjectView
 from src.ui.code_editor import CodeEditor
 from src.ui.output_console import OutputConsole
 
-# KVファイルの読み込み
-Builder.load_string('''
+# KV定義（テーマの定数はロード時に埋め込む）
+KV = '''
 #:kivy 2.0.0
 
 <ArnaMainWindow>:
     orientation: 'vertical'
     canvas.before:
         Color:
-            rgba: app.theme.colors.OFF_WHITE
+            rgba: {OFF_WHITE}
         Rectangle:
             pos: self.pos
             size: self.size
     
     BoxLayout:
         size_hint_y: None
-        height: app.theme.TOOLBAR_HEIGHT
+        height: {TOOLBAR_HEIGHT}
         canvas.before:
             Color:
-                rgba: app.theme.colors.SWEDISH_BLUE
+                rgba: {SWEDISH_BLUE}
             Rectangle:
                 pos: self.pos
                 size: self.size
         
         Label:
             text: 'Arna'
-            color: app.theme.colors.OFF_WHITE
-            font_size: app.theme.FONT_SIZE_H2
-            font_name: app.theme.FONT_FAMILY_MEDIUM
+            color: {OFF_WHITE}
+            font_size: {FONT_SIZE_H2}
+            font_name: {FONT_FAMILY_MEDIUM}
             size_hint_x: None
             width: dp(100)
-            padding: [app.theme.PADDING_MEDIUM, 0]
+            padding: [{PADDING_MEDIUM}, 0]
         
         BoxLayout:
             orientation: 'horizontal'
-            padding: [app.theme.PADDING_MEDIUM, 0]
-            spacing: app.theme.PADDING_MEDIUM
+            padding: [{PADDING_MEDIUM}, 0]
+            spacing: {PADDING_MEDIUM}
             
             Button:
                 text: 'New Project'
                 size_hint_x: None
                 width: dp(120)
-                background_color: app.theme.colors.OFF_WHITE
-                color: app.theme.colors.SWEDISH_BLUE
-                font_name: app.theme.FONT_FAMILY_REGULAR
-                font_size: app.theme.FONT_SIZE_BODY
+                background_color: {OFF_WHITE}
+                color: {SWEDISH_BLUE}
+                font_name: {FONT_FAMILY_REGULAR}
+                font_size: {FONT_SIZE_BODY}
             
             Button:
                 text: 'Open Project'
                 size_hint_x: None
                 width: dp(120)
-                background_color: app.theme.colors.OFF_WHITE
-                color: app.theme.colors.SWEDISH_BLUE
-                font_name: app.theme.FONT_FAMILY_REGULAR
-                font_size: app.theme.FONT_SIZE_BODY
+                background_color: {OFF_WHITE}
+                color: {SWEDISH_BLUE}
+                font_name: {FONT_FAMILY_REGULAR}
+                font_size: {FONT_SIZE_BODY}
             
             Button:
                 text: 'Save'
                 size_hint_x: None
                 width: dp(80)
-                background_color: app.theme.colors.OFF_WHITE
-                color: app.theme.colors.SWEDISH_BLUE
-                font_name: app.theme.FONT_FAMILY_REGULAR
-                font_size: app.theme.FONT_SIZE_BODY
+                background_color: {OFF_WHITE}
+                color: {SWEDISH_BLUE}
+                font_name: {FONT_FAMILY_REGULAR}
+                font_size: {FONT_SIZE_BODY}
     
     BoxLayout:
         orientation: 'horizontal'
@@ -106,7 +106,7 @@ Builder.load_string('''
                 orientation: 'vertical'
                 canvas.before:
                     Color:
-                        rgba: app.theme.colors.LIGHT_GREY
+                        rgba: {LIGHT_GREY}
                     Rectangle:
                         pos: self.pos
                         size: self.size
@@ -115,21 +115,20 @@ Builder.load_string('''
                     text: 'Project Structure'
                     size_hint_y: None
                     height: dp(40)
-                    color: app.theme.colors.DARK_GREY
-                    font_name: app.theme.FONT_FAMILY_MEDIUM
-                    font_size: app.theme.FONT_SIZE_H3
+                    color: {DARK_GREY}
+                    font_name: {FONT_FAMILY_MEDIUM}
+                    font_size: {FONT_SIZE_H3}
                     canvas.before:
                         Color:
-                            rgba: app.theme.colors.OFF_WHITE
+                            rgba: {OFF_WHITE}
                         Rectangle:
                             pos: self.pos
                             size: self.size
                 
-                ScrollView:
-                    id: project_scroll
-                    do_scroll_x: False
+                BoxLayout:
+                    id: project_container
                     
-                    # ProjectViewウィジェットはPythonコードで追加
+                    # ProjectViewウィジェットはPythonコードで追加（自身でスクロールする）
         
         BoxLayout:
             orientation: 'vertical'
@@ -139,7 +138,7 @@ Builder.load_string('''
                 do_default_tab: False
                 tab_width: dp(150)
                 tab_height: dp(40)
-                background_color: app.theme.colors.OFF_WHITE
+                background_color: {OFF_WHITE}
                 
                 # タブはPythonコードで追加
             
@@ -154,7 +153,7 @@ Builder.load_string('''
                     orientation: 'vertical'
                     canvas.before:
                         Color:
-                            rgba: app.theme.colors.LIGHT_GREY
+                            rgba: {LIGHT_GREY}
                         Rectangle:
                             pos: self.pos
                             size: self.size
@@ -163,12 +162,12 @@ Builder.load_string('''
                         text: 'Console Output'
                         size_hint_y: None
                         height: dp(30)
-                        color: app.theme.colors.DARK_GREY
-                        font_name: app.theme.FONT_FAMILY_MEDIUM
-                        font_size: app.theme.FONT_SIZE_BODY
+                        color: {DARK_GREY}
+                        font_name: {FONT_FAMILY_MEDIUM}
+                        font_size: {FONT_SIZE_BODY}
                         canvas.before:
                             Color:
-                                rgba: app.theme.colors.OFF_WHITE
+                                rgba: {OFF_WHITE}
                             Rectangle:
                                 pos: self.pos
                                 size: self.size
@@ -178,12 +177,12 @@ Builder.load_string('''
 <CodeStructureToolbar>:
     orientation: 'horizontal'
     size_hint_y: None
-    height: app.theme.TOOLBAR_HEIGHT
-    padding: [app.theme.PADDING_MEDIUM, app.theme.PADDING_SMALL]
-    spacing: app.theme.PADDING_MEDIUM
+    height: {TOOLBAR_HEIGHT}
+    padding: [{PADDING_MEDIUM}, {PADDING_SMALL}]
+    spacing: {PADDING_MEDIUM}
     canvas.before:
         Color:
-            rgba: app.theme.colors.OFF_WHITE
+            rgba: {OFF_WHITE}
         Rectangle:
             pos: self.pos
             size: self.size
@@ -192,32 +191,37 @@ Builder.load_string('''
         text: 'Add Function'
         size_hint_x: None
         width: dp(120)
-        background_color: app.theme.colors.SWEDISH_BLUE
-        color: app.theme.colors.OFF_WHITE
-        font_name: app.theme.FONT_FAMILY_REGULAR
-        font_size: app.theme.FONT_SIZE_BODY
+        background_color: {SWEDISH_BLUE}
+        color: {OFF_WHITE}
+        font_name: {FONT_FAMILY_REGULAR}
+        font_size: {FONT_SIZE_BODY}
         on_release: app.add_function()
     
     Button:
         text: 'Add Parameter'
         size_hint_x: None
         width: dp(120)
-        background_color: app.theme.colors.SWEDISH_BLUE
-        color: app.theme.colors.OFF_WHITE
-        font_name: app.theme.FONT_FAMILY_REGULAR
-        font_size: app.theme.FONT_SIZE_BODY
+        background_color: {SWEDISH_BLUE}
+        color: {OFF_WHITE}
+        font_name: {FONT_FAMILY_REGULAR}
+        font_size: {FONT_SIZE_BODY}
         on_release: app.add_parameter()
     
     Button:
         text: 'Generate Code'
         size_hint_x: None
         width: dp(120)
-        background_color: app.theme.colors.SWEDISH_BLUE
-        color: app.theme.colors.OFF_WHITE
-        font_name: app.theme.FONT_FAMILY_REGULAR
-        font_size: app.theme.FONT_SIZE_BODY
+        background_color: {SWEDISH_BLUE}
+        color: {OFF_WHITE}
+        font_name: {FONT_FAMILY_REGULAR}
+        font_size: {FONT_SIZE_BODY}
         on_release: app.generate_code()
-''')
+'''
+
+# KVの読み込み（モジュールが再読み込みされても二重に解析しない）
+KV_FILENAME = 'kivy_application.kv'
+if KV_FILENAME not in Builder.files:
+    Builder.load_string(KV.format(**SwedishMinimalistTheme.kv_constants()), filename=KV_FILENAME)
 
 
 class ArnaMainWindow(BoxLayout):
@@ -228,7 +232,7 @@ class ArnaMainWindow(BoxLayout):
         
         # プロジェクトビューの追加
         self.project_view = ProjectView()
-        self.ids.project_scroll.add_widget(self.project_view)
+        self.ids.project_container.add_widget(self.project_view)
         
         # コードエディタの初期タブを追加
         self.add_editor_tab("Welcome", "Welcome to Arna!")
@@ -249,12 +253,35 @@ class ArnaMainWindow(BoxLayout):
             title: タブのタイトル
             content: 初期コンテンツ
         """
-        tab_header = TabbedPanelHeader(text=title)
-        editor = CodeEditor(text=content)
-        tab_header.content = editor
-        self.ids.editor_tabs.add_widget(tab_header)
-        self.ids.editor_tabs.switch_to(tab_header)
-        return editor
+        return self.add_editor_tabs([(title, content)])[0]
+    
+    def add_editor_tabs(self, specs):
+        """
+        複数のエディタタブをまとめて追加します。
+        
+        タブの切り替えは最後のタブに対して一度だけ行うため、
+        起動時に多数のタブを復元する場合でも中間の切り替えが発生しません。
+        
+        Args:
+            specs: (タイトル, 初期コンテンツ) のリスト
+            
+        Returns:
+            追加されたエディタのリスト
+        """
+        editor_tabs = self.ids.editor_tabs
+        editors = []
+        tab_header = None
+        
+        for title, content in specs:
+            tab_header = TabbedPanelHeader(text=title)
+            editor = CodeEditor(text=content)
+            tab_header.content = editor
+            editor_tabs.add_widget(tab_header)
+            editors.append(editor)
+        
+        if tab_header is not None:
+            editor_tabs.switch_to(tab_header)
+        return editors
 
 
 class CodeStructureToolbar(BoxLayout):
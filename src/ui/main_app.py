@@ -5,17 +5,21 @@ This module provides the main screen for the desktop application using Kivy and
 """
 
 import os
+from collections import deque
 from kivy.app import App
+from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.splitter import Splitter
 from kivy.uix.tabbedpanel import TabbedPanel, TabbedPanelItem
 from kivy.properties import ObjectProperty, StringProperty
 from kivy.uix.treeview import TreeView
 from kivy.uix.label import Label
+from kivy.uix.codeinput import CodeInput
+from kivy.uix.textinput import TextInput
 from kivymd.app import MDApp
-from kivymd.uix.button import MDRaisedButton
+from kivymd.uix.button import MDRaisedButton, MDIconButton
+from kivymd.uix.label import MDLabel
 from kivymd.uix.toolbar import MDTopAppBar
-from kivymd.uix.filemanager import MDFileManager
 from kivymd.toast import toast
 
 # Import internal modules
@@ -23,6 +27,20 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.agent_core import AgentManager
 from tools.code_structure import CodeStructureManager
+from src.ui.file_io import write_text_file
+
+
+# The Pygments lexer is imported on first use and shared by all editors
+_PYTHON_LEXER = None
+
+
+def _get_python_lexer():
+    """Return the shared Python lexer"""
+    global _PYTHON_LEXER
+    if _PYTHON_LEXER is None:
+        from pygments.lexers.python import PythonLexer
+        _PYTHON_LEXER = PythonLexer()
+    return _PYTHON_LEXER
 
 
 class ProjectView(BoxLayout):
@@ -34,7 +52,6 @@ class ProjectView(BoxLayout):
         self.code_structure_manager = CodeStructureManager()
         
         # Add label for project information
-        from kivymd.uix.label import MDLabel
         self.project_info = MDLabel(
             text="Project: None",
             halign="center",
@@ -44,7 +61,6 @@ class ProjectView(BoxLayout):
         self.add_widget(self.project_info)
         
         # Add TreeView for project structure
-        from kivy.uix.treeview import TreeView
         self.tree_view = TreeView(
             size_hint=(1, 1),
             hide_root=False,
@@ -80,14 +96,12 @@ class CodeEditor(BoxLayout):
             height=50
         )
         
-        from kivymd.uix.label import MDLabel
         self.file_label = MDLabel(
             text="File: None",
             halign="left"
         )
         header.add_widget(self.file_label)
         
-        from kivymd.uix.button import MDIconButton
         save_button = MDIconButton(
             icon="content-save",
             on_release=self.save_file
@@ -97,10 +111,8 @@ class CodeEditor(BoxLayout):
         self.add_widget(header)
         
         # Code editor section
-        from kivy.uix.codeinput import CodeInput
-        from pygments.lexers.python import PythonLexer
         self.code_input = CodeInput(
-            lexer=PythonLexer(),
+            lexer=_get_python_lexer(),
             size_hint=(1, 1)
         )
         self.add_widget(self.code_input)
@@ -114,11 +126,21 @@ class CodeEditor(BoxLayout):
         Args:
             file_path: File path
         """
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                self.code_input.text = f.read()
-            self.current_file = file_path
-            self.file_label.text = f"File: {os.path.basename(file_path)}"
+        # Let the stat/open report a missing file instead of checking first
+        try:
+            # Read the whole file in a single call and decode once
+            size = os.path.getsize(file_path)
+            with open(file_path, 'rb', buffering=0) as f:
+                data = f.read(size)
+        except FileNotFoundError:
+            return
+        
+        file_name = os.path.basename(file_path)
+        # Normalise CRLF/CR to LF as text mode used to
+        text = data.decode('utf-8')
+        self.code_input.text = text.replace('\r\n', '\n').replace('\r', '\n')
+        self.current_file = file_path
+        self.file_label.text = f"File: {file_name}"
     
     def save_file(self, instance=None):
         """
@@ -128,14 +150,17 @@ class CodeEditor(BoxLayout):
             instance: Button instance (optional)
         """
         if self.current_file:
-            with open(self.current_file, 'w') as f:
-                f.write(self.code_input.text)
+            # Atomic write through a unique temp file (shared with the editor)
+            write_text_file(self.current_file, self.code_input.text)
             toast(f"File saved: {os.path.basename(self.current_file)}")
 
 
 class OutputConsole(BoxLayout):
     """Console to display output and logs"""
     
+    # Maximum number of lines kept in the console
+    MAX_LINES = 2000
+    
     def __init__(self, **kwargs):
         super(OutputConsole, self).__init__(**kwargs)
         self.orientation = 'vertical'
@@ -146,13 +171,11 @@ class OutputConsole(BoxLayout):
             height=50
         )
         
-        from kivymd.uix.label import MDLabel
         header.add_widget(MDLabel(
             text="Output Console",
             halign="left"
         ))
         
-        from kivymd.uix.button import MDIconButton
         clear_button = MDIconButton(
             icon="delete",
             on_release=self.clear_console
@@ -162,13 +185,19 @@ class OutputConsole(BoxLayout):
         self.add_widget(header)
         
         # Console output section
-        from kivy.uix.textinput import TextInput
         self.console_output = TextInput(
             readonly=True,
             multiline=True,
             size_hint=(1, 1)
         )
         self.add_widget(self.console_output)
+        
+        # Buffered lines, written to the TextInput at most once per frame
+        self._lines = deque(maxlen=self.MAX_LINES)
+        self._pending = []
+        # Length (including the newline) of each line shown in the TextInput
+        self._shown_lengths = deque()
+        self._flush_trigger = Clock.create_trigger(self.flush)
     
     def append_output(self, text):
         """
@@ -177,9 +206,54 @@ class OutputConsole(BoxLayout):
         Args:
             text: Text to append
         """
-        self.console_output.text += text + "\n"
+        self._lines.append(text)
+        self._pending.append(text)
+        self._flush_trigger()
+    
+    def flush(self, *args):
+        """Write buffered lines to the console"""
+        if not self._pending:
+            return
+        
+        pending = self._pending
+        if len(pending) >= self.MAX_LINES:
+            # The new lines alone fill the buffer, so replace the whole text
+            self.console_output.text = "\n".join(self._lines) + "\n"
+            self._shown_lengths = deque(len(line) + 1 for line in self._lines)
+        else:
+            # Append only the new lines and drop the oldest ones from the front,
+            # instead of rebuilding the whole text once the buffer is full
+            self._shown_lengths.extend(len(line) + 1 for line in pending)
+            overflow = len(self._shown_lengths) - self.MAX_LINES
+            trim = sum(self._shown_lengths.popleft() for _ in range(overflow))
+            self._edit_text("".join(line + "\n" for line in pending), trim)
+        pending.clear()
+        
         # Auto-scroll
-        self.console_output.cursor = (0, len(self.console_output.text))
+        self.console_output.do_cursor_movement('cursor_end', control=True)
+    
+    def _edit_text(self, text, trim=0):
+        """
+        Insert text at the end of the console and remove characters from the start
+        
+        Args:
+            text: Text to insert
+            trim: Number of characters to remove from the start
+        """
+        console_output = self.console_output
+        # insert_text and delete_selection are ignored while the TextInput is read-only
+        console_output.readonly = False
+        try:
+            console_output.do_cursor_movement('cursor_end', control=True)
+            console_output.insert_text(text)
+            if trim:
+                console_output.select_text(0, trim)
+                console_output.delete_selection()
+        finally:
+            console_output.readonly = True
+        # Nothing in a read-only console can be undone, so don't keep the
+        # undo records (each holds a copy of the inserted text)
+        console_output.reset_undo()
     
     def clear_console(self, instance=None):
         """
@@ -188,6 +262,9 @@ class OutputConsole(BoxLayout):
         Args:
             instance: Button instance (optional)
         """
+        self._lines.clear()
+        self._pending.clear()
+        self._shown_lengths.clear()
         self.console_output.text = ""
 
 
@@ -279,19 +356,23 @@ class ManusAgentUI(BoxLayout):
         
         self.add_widget(bottom_panel)
         
-        # File manager
-        self.file_manager = MDFileManager(
-            exit_manager=self.exit_file_manager,
-            select_path=self.select_path
-        )
+        # File manager (created on first use to keep it off the startup path)
+        self.file_manager = None
     
     def show_file_manager(self):
         """Show file manager"""
+        if self.file_manager is None:
+            from kivymd.uix.filemanager import MDFileManager
+            self.file_manager = MDFileManager(
+                exit_manager=self.exit_file_manager,
+                select_path=self.select_path
+            )
         self.file_manager.show(os.path.expanduser("~"))
     
     def exit_file_manager(self, *args):
         """Close file manager"""
-        self.file_manager.close()
+        if self.file_manager is not None:
+            self.file_manager.close()
     
     def select_path(self, path):
         """
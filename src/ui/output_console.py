@@ -8,35 +8,36 @@ Arna - Output Console
 """
 
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.scrollview import ScrollView
 from kivy.uix.label import Label
-from kivy.uix.textinput import TextInput
-from kivy.uix.button import Button
-from kivy.properties import StringProperty, ListProperty
-from kivy.metrics import dp
+from kivy.properties import StringProperty, NumericProperty
 from kivy.lang import Builder
 from kivy.clock import Clock
+from kivy.core.text import Label as CoreLabel
 import time
 import re
+import codecs
+from collections import deque
+from itertools import islice
 
 # 自作モジュールのインポート
 from src.ui.theme import SwedishMinimalistTheme
 
-# KVファイルの読み込み
-Builder.load_string('''
+# ANSIエスケープシーケンス（色指定など）
+_ANSI_RE = re.compile(r'\x1b\[[0-?]*[ -/]*[@-~]')
+
+# KVファイルの読み込み（テーマの定数はロード時に埋め込む）
+KV = '''
 #:kivy 2.0.0
 
 <ConsoleOutput>:
-    readonly: True
-    background_color: app.theme.colors.OFF_WHITE
-    foreground_color: app.theme.colors.DARK_GREY
-    font_name: app.theme.FONT_FAMILY_MONO
-    font_size: app.theme.FONT_SIZE_SMALL
-    padding: [app.theme.PADDING_MEDIUM, app.theme.PADDING_MEDIUM]
+    orientation: 'vertical'
+    font_name: {FONT_FAMILY_MONO}
+    font_size: {FONT_SIZE_SMALL}
+    padding: [{PADDING_MEDIUM}, {PADDING_MEDIUM}]
     
     canvas.before:
         Color:
-            rgba: app.theme.colors.OFF_WHITE
+            rgba: {OFF_WHITE}
         Rectangle:
             pos: self.pos
             size: self.size
@@ -47,12 +48,12 @@ Builder.load_string('''
     BoxLayout:
         orientation: 'horizontal'
         size_hint_y: None
-        height: app.theme.TOOLBAR_HEIGHT
-        padding: [app.theme.PADDING_MEDIUM, app.theme.PADDING_SMALL]
-        spacing: app.theme.PADDING_MEDIUM
+        height: {TOOLBAR_HEIGHT}
+        padding: [{PADDING_MEDIUM}, {PADDING_SMALL}]
+        spacing: {PADDING_MEDIUM}
         canvas.before:
             Color:
-                rgba: app.theme.colors.LIGHT_GREY
+                rgba: {LIGHT_GREY}
             Rectangle:
                 pos: self.pos
                 size: self.size
@@ -61,60 +62,206 @@ Builder.load_string('''
             text: 'Clear'
             size_hint_x: None
             width: dp(80)
-            background_color: app.theme.colors.SWEDISH_BLUE
-            color: app.theme.colors.OFF_WHITE
-            font_name: app.theme.FONT_FAMILY_REGULAR
-            font_size: app.theme.FONT_SIZE_BODY
+            background_color: {SWEDISH_BLUE}
+            color: {OFF_WHITE}
+            font_name: {FONT_FAMILY_REGULAR}
+            font_size: {FONT_SIZE_BODY}
             on_release: root.clear_output()
         
         Button:
             text: 'Copy'
             size_hint_x: None
             width: dp(80)
-            background_color: app.theme.colors.SWEDISH_BLUE
-            color: app.theme.colors.OFF_WHITE
-            font_name: app.theme.FONT_FAMILY_REGULAR
-            font_size: app.theme.FONT_SIZE_BODY
+            background_color: {SWEDISH_BLUE}
+            color: {OFF_WHITE}
+            font_name: {FONT_FAMILY_REGULAR}
+            font_size: {FONT_SIZE_BODY}
             on_release: root.copy_output()
         
         Label:
             text: root.status_text
-            color: app.theme.colors.DARK_GREY
-            font_name: app.theme.FONT_FAMILY_REGULAR
-            font_size: app.theme.FONT_SIZE_SMALL
+            color: {DARK_GREY}
+            font_name: {FONT_FAMILY_REGULAR}
+            font_size: {FONT_SIZE_SMALL}
             text_size: self.size
             halign: 'right'
             valign: 'middle'
     
     ScrollView:
         id: scroll_view
-        do_scroll_x: False
         
         ConsoleOutput:
             id: console_output
-            size_hint: 1, None
+            size_hint: None, None
+            width: max(self.content_width, scroll_view.width)
             height: max(self.minimum_height, scroll_view.height)
-''')
+'''
 
+# モジュールが再読み込みされても二重に解析しない
+KV_FILENAME = 'output_console.kv'
+if KV_FILENAME not in Builder.files:
+    Builder.load_string(KV.format(**SwedishMinimalistTheme.kv_constants()), filename=KV_FILENAME)
 
-class ConsoleOutput(TextInput):
-    """コンソール出力を表示するテキスト入力ウィジェット"""
+
+class ConsoleOutput(BoxLayout):
+    """
+    コンソール出力を表示するログビュー
     
-    def __init__(self, **kwargs):
-        super(ConsoleOutput, self).__init__(**kwargs)
-        self.bind(focus=self.on_focus)
-    
-    def on_focus(self, instance, value):
-        """フォーカスが変更されたときのコールバック"""
-        # 読み取り専用のため、フォーカスを解除
-        if value:
-            self.focus = False
+    メッセージごとに1つのLabelを縦に並べます。等幅フォントを前提に、
+    文字幅と行の高さからLabelの大きさを計算するため、テキストの計測を行いません。
+    """
+    
+    font_name = StringProperty(SwedishMinimalistTheme.FONT_FAMILY_MONO)
+    font_size = NumericProperty(SwedishMinimalistTheme.FONT_SIZE_SMALL)
+    content_width = NumericProperty(0)  # 最も長い行の幅
+    
+    # (フォント名, フォントサイズ) -> 1文字の幅
+    _char_width_cache = {}
+    
+    def on_font_name(self, instance, value):
+        """フォントが変更されたときに表示中のメッセージへ反映します"""
+        self._refresh_labels()
+    
+    def on_font_size(self, instance, value):
+        """フォントサイズが変更されたときに表示中のメッセージへ反映します"""
+        self._refresh_labels()
+    
+    @property
+    def message_count(self):
+        """表示中のメッセージ数"""
+        return len(self.children)
+    
+    def append_messages(self, messages):
+        """
+        メッセージを末尾に追加します。
+        
+        Args:
+            messages: (整形済みメッセージ, メッセージの種類) のリスト
+        """
+        for message in messages:
+            self.add_widget(self._create_label(*message))
+    
+    def prepend_messages(self, messages):
+        """
+        メッセージを先頭に追加します。
+        
+        Args:
+            messages: (整形済みメッセージ, メッセージの種類) のリスト
+        """
+        # childrenは末尾が先頭の表示位置になるため、逆順にその位置へ追加する
+        for message in reversed(messages):
+            self.add_widget(self._create_label(*message), index=len(self.children))
+    
+    def replace_last_message(self, message):
+        """
+        末尾のメッセージを置き換えます。
+        
+        Args:
+            message: (整形済みメッセージ, メッセージの種類)
+        """
+        if not self.children:
+            return
+        label = self.children[0]
+        old_width = label.width
+        label.text = message[0].rstrip("\n")
+        self._size_label(label)
+        # 短くなった場合は最も長い行だった可能性があるため計算し直す
+        if label.width < old_width:
+            self._update_content_width()
+    
+    def remove_leading_messages(self, count):
+        """
+        先頭から指定した数のメッセージを削除します。
+        
+        Args:
+            count: 削除するメッセージ数
+        """
+        if count <= 0:
+            return
+        for label in self.children[-count:]:
+            self.remove_widget(label)
+        # 削除した中に最も長い行があった場合に備えて計算し直す
+        self._update_content_width()
+    
+    def clear_messages(self):
+        """すべてのメッセージを削除します"""
+        self.clear_widgets()
+        self.content_width = 0
+    
+    def _char_width(self):
+        """等幅フォントの1文字の幅を取得します"""
+        key = (self.font_name, self.font_size)
+        width = self._char_width_cache.get(key)
+        if width is None:
+            width = CoreLabel(font_name=self.font_name, font_size=self.font_size).get_extents('M')[0]
+            self._char_width_cache[key] = width
+        return width
+    
+    def _line_height(self):
+        """1行の高さを取得します"""
+        return self.font_size * 1.2
+    
+    def _create_label(self, text, message_type):
+        """
+        メッセージを表示するLabelを作成します。
+        
+        Args:
+            text: 整形済みメッセージ
+            message_type: メッセージの種類
+        """
+        label = Label(
+            text=text.rstrip("\n"),
+            color=OutputConsole.message_colors.get(message_type, OutputConsole.message_colors['info']),
+            font_name=self.font_name,
+            font_size=self.font_size,
+            size_hint=(None, None),
+        )
+        self._size_label(label)
+        return label
+    
+    def _size_label(self, label):
+        """
+        Labelの大きさを設定します。
+
+        タブを含まないASCIIのみのテキストは全グリフの幅が等しいため、
+        行数と最長の行の文字数から計算してテクスチャの生成を省きます。
+        日本語などの全角文字やタブを含む場合は実際に描画して計測します。
+        """
+        text = label.text
+        if text.isascii() and "\t" not in text:
+            lines = text.split("\n")
+            label.width = max(len(line) for line in lines) * self._char_width()
+            label.height = len(lines) * self._line_height()
+        else:
+            label.texture_update()
+            label.size = label.texture_size
+        width = label.width + self.padding[0] + self.padding[2]
+        if width > self.content_width:
+            self.content_width = width
+    
+    def _update_content_width(self):
+        """表示中のLabelから最も長い行の幅を計算し直します"""
+        if not self.children:
+            self.content_width = 0
+            return
+        widest = max(label.width for label in self.children)
+        self.content_width = widest + self.padding[0] + self.padding[2]
+    
+    def _refresh_labels(self):
+        """表示中のLabelのフォントと大きさを設定し直します"""
+        self.content_width = 0
+        for label in self.children:
+            label.font_name = self.font_name
+            label.font_size = self.font_size
+            self._size_label(label)
 
 
 class OutputConsole(BoxLayout):
     """出力コンソールコンポーネント"""
     
     status_text = StringProperty('')
+    max_lines = NumericProperty(5000)  # 保持するメッセージの最大数
+    visible_window = NumericProperty(500)  # コンソールに表示するメッセージ数
     message_colors = {
         'info': SwedishMinimalistTheme.colors.DARK_GREY,
         'success': SwedishMinimalistTheme.colors.SUCCESS,
@@ -123,8 +270,49 @@ class OutputConsole(BoxLayout):
     }
     
     def __init__(self, **kwargs):
+        self.message_history = deque(maxlen=int(kwargs.get('max_lines', self.max_lines)))
+        
+        # 表示待ちのメッセージ
+        self._pending = []
+        self._flush_scheduled = False
+        self._scroll_pending = False
+        
+        # 直前のメッセージ (本文, 種類) と連続した回数
+        self._last_message = None
+        self._repeat_count = 0
+        
+        # 履歴全体を連結したテキスト（履歴が変更されたらNoneに戻す）
+        self._joined_cache = None
+        
+        # ストリーミング中のコマンド出力のデコーダと、改行が来ていない行の断片
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._line_buf = []
+        
+        # 現在コンソールに表示するメッセージ数（上端までスクロールすると広がる）
+        self._window_size = int(kwargs.get('visible_window', self.visible_window))
+        
+        # (UNIX時刻の秒, 整形済みのタイムスタンプ接頭辞) 同じ秒の間は整形を再利用する
+        self._ts_cache = (0, "")
+        
         super(OutputConsole, self).__init__(**kwargs)
-        self.message_history = []
+        
+        # 上端付近までスクロールしたら古いメッセージを読み込む
+        self.ids.scroll_view.bind(scroll_y=self._on_scroll_y)
+    
+    def on_max_lines(self, instance, value):
+        """最大メッセージ数が変更されたときに履歴と表示を切り詰めます"""
+        if self.message_history.maxlen == int(value):
+            return
+        self.message_history = deque(self.message_history, maxlen=int(value))
+        self._joined_cache = None
+        if 'console_output' in self.ids:
+            self._rebuild_console_output()
+    
+    def on_visible_window(self, instance, value):
+        """表示するメッセージ数が変更されたときに表示を作り直します"""
+        self._window_size = int(value)
+        if 'console_output' in self.ids:
+            self._rebuild_console_output()
     
     def add_message(self, message, message_type='info'):
         """
@@ -135,19 +323,23 @@ class OutputConsole(BoxLayout):
             message_type: メッセージの種類（'info', 'success', 'warning', 'error'）
         """
         # タイムスタンプの追加
-        timestamp = time.strftime('%H:%M:%S')
+        ts_prefix = self._ts_prefix()
         
-        # メッセージの整形
-        formatted_message = f"[{timestamp}] {message}\n"
+        # 直前と同じメッセージは追加せず、末尾のメッセージに回数を表示する
+        if (message, message_type) == self._last_message and self.message_history:
+            self._repeat_count += 1
+            self._replace_last_message(
+                (f"{ts_prefix}{message} (×{self._repeat_count})\n", message_type)
+            )
+            return
+        self._last_message = (message, message_type)
+        self._repeat_count = 1
         
-        # メッセージの保存
-        self.message_history.append((formatted_message, message_type))
+        # メッセージの整形
+        formatted_message = ts_prefix + message + "\n"
         
         # メッセージの表示
-        self._update_console_output()
-        
-        # スクロールを最下部に移動
-        Clock.schedule_once(self._scroll_to_end, 0.1)
+        self._append_messages([(formatted_message, message_type)])
     
     def add_command_output(self, command, output, exit_code=0):
         """
@@ -159,53 +351,226 @@ class OutputConsole(BoxLayout):
             exit_code: 終了コード
         """
         # タイムスタンプの追加
-        timestamp = time.strftime('%H:%M:%S')
+        ts_prefix = self._ts_prefix()
         
         # コマンドの表示
-        command_message = f"[{timestamp}] $ {command}\n"
-        self.message_history.append((command_message, 'info'))
+        messages = [(ts_prefix + "$ " + command + "\n", 'info')]
         
         # 出力の表示
         if output:
+            # 色指定などのエスケープシーケンスを除去
+            output = _ANSI_RE.sub('', output)
+            
             # 長い出力は省略
             if len(output) > 1000:
                 output = output[:1000] + "...\n(output truncated)"
             
-            self.message_history.append((output + "\n", 'info'))
+            messages.append((output + "\n", 'info'))
         
         # 終了コードの表示
         message_type = 'success' if exit_code == 0 else 'error'
-        exit_message = f"[{timestamp}] Exit code: {exit_code}\n"
-        self.message_history.append((exit_message, message_type))
+        messages.append((f"{ts_prefix}Exit code: {exit_code}\n", message_type))
         
         # メッセージの表示
-        self._update_console_output()
+        self._last_message = None
+        self._append_messages(messages)
+    
+    def start_command(self, command):
+        """
+        出力をストリーミングするコマンドの開始を表示します。
+        
+        出力はadd_command_chunkで逐次追加し、end_commandで終了コードを表示します。
         
-        # スクロールを最下部に移動
-        Clock.schedule_once(self._scroll_to_end, 0.1)
+        Args:
+            command: 実行するコマンド
+        """
+        self._decoder.reset()
+        self._line_buf = []
+        self._last_message = None
+        self._append_messages([(self._ts_prefix() + "$ " + command + "\n", 'info')])
+    
+    def add_command_chunk(self, data):
+        """
+        コマンド出力の断片（バイト列）を追加します。
+        
+        UTF-8として逐次デコードし、改行までそろった行だけを表示します。
+        
+        Args:
+            data: コマンド出力のバイト列
+        """
+        parts = self._decoder.decode(data).split("\n")
+        if len(parts) == 1:
+            # 改行が含まれていない場合は次の断片を待つ
+            self._line_buf.append(parts[0])
+            return
+        
+        parts[0] = "".join(self._line_buf) + parts[0]
+        self._line_buf = [parts.pop()]
+        
+        self._last_message = None
+        self._append_messages([(_ANSI_RE.sub('', "\n".join(parts)) + "\n", 'info')])
+    
+    def end_command(self, exit_code=0):
+        """
+        ストリーミング中のコマンドの残りの出力と終了コードを表示します。
+        
+        Args:
+            exit_code: 終了コード
+        """
+        messages = []
+        tail = "".join(self._line_buf) + self._decoder.decode(b'', final=True)
+        self._line_buf = []
+        if tail:
+            messages.append((_ANSI_RE.sub('', tail) + "\n", 'info'))
+        
+        message_type = 'success' if exit_code == 0 else 'error'
+        messages.append((f"{self._ts_prefix()}Exit code: {exit_code}\n", message_type))
+        
+        self._last_message = None
+        self._append_messages(messages)
     
     def clear_output(self):
         """出力をクリアします"""
-        self.message_history = []
-        self.ids.console_output.text = ""
+        self.message_history.clear()
+        self._joined_cache = None
+        self._pending = []
+        self._last_message = None
+        self._window_size = int(self.visible_window)
+        self.ids.console_output.clear_messages()
         self.status_text = "出力をクリアしました"
     
     def copy_output(self):
         """出力をクリップボードにコピーします"""
         from kivy.core.clipboard import Clipboard
-        Clipboard.copy(self.ids.console_output.text)
+        # コンソールには直近のメッセージしか表示していないため履歴から組み立てる
+        Clipboard.copy(self._history_text())
         self.status_text = "出力をコピーしました"
     
-    def _update_console_output(self):
-        """コンソール出力を更新します"""
-        # テキストの更新
-        self.ids.console_output.text = "".join([msg[0] for msg in self.message_history])
+    def _ts_prefix(self):
+        """
+        現在時刻のタイムスタンプ接頭辞（"[HH:MM:SS] "）を取得します。
+        
+        整形結果は秒単位でキャッシュし、同じ秒内のメッセージでは再利用します。
+        """
+        t = int(time.time())
+        if t != self._ts_cache[0]:
+            self._ts_cache = (t, f"[{time.strftime('%H:%M:%S', time.localtime(t))}] ")
+        return self._ts_cache[1]
+    
+    def _append_messages(self, messages):
+        """
+        メッセージを履歴に保存し、次のフレームでの表示を予約します。
+        
+        同じフレーム内に追加されたメッセージは、まとめて一度だけ表示に反映されます。
+        
+        Args:
+            messages: (整形済みメッセージ, メッセージの種類) のリスト
+        """
+        self.message_history.extend(messages)
+        self._joined_cache = None
+        self._pending.extend(messages)
+        
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            Clock.schedule_once(self._flush, 0)
+    
+    def _replace_last_message(self, message):
+        """
+        履歴の末尾のメッセージを置き換え、表示にも反映します。
+        
+        Args:
+            message: (整形済みメッセージ, メッセージの種類)
+        """
+        self.message_history[-1] = message
+        self._joined_cache = None
+        if self._pending:
+            # 末尾のメッセージはまだ表示されていない
+            self._pending[-1] = message
+        else:
+            self.ids.console_output.replace_last_message(message)
+    
+    def _flush(self, dt):
+        """表示待ちのメッセージをコンソールの末尾に追加します"""
+        self._flush_scheduled = False
+        if not self._pending:
+            return
+        
+        history = self.message_history
+        console_output = self.ids.console_output
+        
+        # 表示待ちのうち表示範囲に入るもの（古いものは上限で押し出されている）
+        target_count = min(len(history), self._window_size)
+        new_count = min(len(self._pending), target_count)
+        new_messages = self._pending[-new_count:] if new_count else []
+        self._pending = []
+        
+        # 表示中のメッセージのうち表示範囲から外れたものを先頭から削除する
+        kept_count = target_count - new_count
+        evict_count = console_output.message_count - kept_count
+        if evict_count > 0 and kept_count == 0:
+            # 表示中のメッセージがすべて押し出された場合は作り直す
+            self._rebuild_console_output()
+        else:
+            console_output.remove_leading_messages(evict_count)
+            console_output.append_messages(new_messages)
+        
+        # スクロールを最下部に移動（予約済みなら重ねて予約しない）
+        if not self._scroll_pending and self.ids.scroll_view.scroll_y > 0:
+            self._scroll_pending = True
+            Clock.schedule_once(self._scroll_to_end, 0)
+    
+    def _rebuild_console_output(self):
+        """履歴の末尾（表示範囲分）からコンソールの表示を作り直します"""
+        self._pending = []
+        history = self.message_history
+        window = list(islice(history, max(len(history) - self._window_size, 0), None))
+        console_output = self.ids.console_output
+        console_output.clear_messages()
+        console_output.append_messages(window)
+    
+    def _on_scroll_y(self, instance, value):
+        """上端付近までスクロールされたときに古いメッセージを読み込みます"""
+        # Kivyのscroll_yは上端が1、下端が0
+        if value > 0.95 and self.ids.console_output.message_count < len(self.message_history):
+            self._load_older_messages()
+    
+    def _load_older_messages(self):
+        """表示範囲を広げ、1ページ分の古いメッセージを先頭に追加します"""
+        history = self.message_history
+        console_output = self.ids.console_output
+        shown_count = console_output.message_count
+        start = max(len(history) - shown_count - int(self.visible_window), 0)
+        older = list(islice(history, start, len(history) - shown_count))
+        if not older:
+            return
+        
+        self._window_size = shown_count + len(older)
+        scroll_view = self.ids.scroll_view
+        old_height = console_output.height
+        
+        console_output.prepend_messages(older)
+        
+        # 追加した分だけスクロール位置をずらし、表示していた行を画面内に留める
+        def keep_position(dt):
+            scrollable = console_output.height - scroll_view.height
+            if scrollable > 0:
+                added = console_output.height - old_height
+                scroll_view.scroll_y = max(0.0, min(1.0, 1 - added / scrollable))
+        Clock.schedule_once(keep_position, 0)
     
     def _scroll_to_end(self, dt):
         """スクロールを最下部に移動します"""
-        self.ids.console_output.cursor = (0, len(self.ids.console_output.text))
-        self.ids.scroll_view.scroll_y = 0
+        self._scroll_pending = False
+        scroll_view = self.ids.scroll_view
+        if scroll_view.scroll_y > 0:
+            scroll_view.scroll_y = 0
     
     def get_output_text(self):
         """出力テキストを取得します"""
-        return self.ids.console_output.text
+        return self._history_text()
+    
+    def _history_text(self):
+        """履歴全体を連結したテキストを取得します（履歴が変わるまで再利用します）"""
+        if self._joined_cache is None:
+            self._joined_cache = "".join(msg[0] for msg in self.message_history)
+        return self._joined_cache
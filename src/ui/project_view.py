@@ -7,48 +7,64 @@ Arna - Project View
 プロジェクト内の関数、パラメータ、戻り値などの構造を階層的に表示します。
 """
 
-from kivy.uix.treeview import TreeView, TreeViewNode, TreeViewLabel
-from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.uix.label import Label
-from kivy.uix.button import Button
 from kivy.uix.popup import Popup
-from kivy.uix.textinput import TextInput
-from kivy.properties import ObjectProperty, StringProperty
+from kivy.properties import ObjectProperty, StringProperty, NumericProperty, BooleanProperty
 from kivy.metrics import dp
 from kivy.lang import Builder
+from kivy.clock import Clock
 
 # 自作モジュールのインポート
 from src.ui.theme import SwedishMinimalistTheme
 
-# KVファイルの読み込み
-Builder.load_string('''
+# KVファイルの読み込み（テーマの定数はロード時に埋め込む）
+KV = '''
 #:kivy 2.0.0
 
 <ProjectView>:
     canvas.before:
         Color:
-            rgba: app.theme.colors.OFF_WHITE
+            rgba: {OFF_WHITE}
         Rectangle:
             pos: self.pos
             size: self.size
     
-    hide_root: True
-    indent_level: dp(20)
+    viewclass: 'ProjectTreeLabel'
+    do_scroll_x: False
     size_hint: 1, 1
+    
+    RecycleBoxLayout:
+        orientation: 'vertical'
+        default_size: None, dp(30)
+        default_size_hint: 1, None
+        size_hint_y: None
+        height: self.minimum_height
 
 <ProjectTreeLabel>:
-    color: app.theme.colors.DARK_GREY
-    font_name: app.theme.FONT_FAMILY_REGULAR
-    font_size: app.theme.FONT_SIZE_BODY
+    color: {DARK_GREY}
+    font_name: {FONT_FAMILY_REGULAR}
+    font_size: {FONT_SIZE_BODY}
+    size_hint_y: None
     height: dp(30)
-    padding: [app.theme.PADDING_MEDIUM, 0]
+    padding: [{PADDING_MEDIUM} + self.indent, 0]
+    text_size: self.size
+    halign: 'left'
+    valign: 'middle'
+    shorten: True
     
     canvas.before:
         Color:
-            rgba: app.theme.colors.OFF_WHITE if not self.is_selected else app.theme.colors.LIGHT_GREY
+            rgba: {OFF_WHITE} if not self.is_selected else {LIGHT_GREY}
         Rectangle:
             pos: self.pos
             size: self.size
+'''
+
+# ダイアログのKV（最初にダイアログを開くときに読み込む）
+KV_DIALOGS = '''
+#:kivy 2.0.0
 
 <AddFunctionDialog>:
     title: 'Add Function'
@@ -57,16 +73,16 @@ Builder.load_string('''
     
     BoxLayout:
         orientation: 'vertical'
-        padding: app.theme.PADDING_MEDIUM
-        spacing: app.theme.PADDING_MEDIUM
+        padding: {PADDING_MEDIUM}
+        spacing: {PADDING_MEDIUM}
         
         Label:
             text: 'Function Name:'
             size_hint_y: None
             height: dp(30)
-            color: app.theme.colors.DARK_GREY
-            font_name: app.theme.FONT_FAMILY_REGULAR
-            font_size: app.theme.FONT_SIZE_BODY
+            color: {DARK_GREY}
+            font_name: {FONT_FAMILY_REGULAR}
+            font_size: {FONT_SIZE_BODY}
             halign: 'left'
             text_size: self.size
         
@@ -75,16 +91,16 @@ Builder.load_string('''
             size_hint_y: None
             height: dp(40)
             multiline: False
-            font_name: app.theme.FONT_FAMILY_REGULAR
-            font_size: app.theme.FONT_SIZE_BODY
+            font_name: {FONT_FAMILY_REGULAR}
+            font_size: {FONT_SIZE_BODY}
         
         Label:
             text: 'Description:'
             size_hint_y: None
             height: dp(30)
-            color: app.theme.colors.DARK_GREY
-            font_name: app.theme.FONT_FAMILY_REGULAR
-            font_size: app.theme.FONT_SIZE_BODY
+            color: {DARK_GREY}
+            font_name: {FONT_FAMILY_REGULAR}
+            font_size: {FONT_SIZE_BODY}
             halign: 'left'
             text_size: self.size
         
@@ -93,31 +109,31 @@ Builder.load_string('''
             size_hint_y: None
             height: dp(80)
             multiline: True
-            font_name: app.theme.FONT_FAMILY_REGULAR
-            font_size: app.theme.FONT_SIZE_BODY
+            font_name: {FONT_FAMILY_REGULAR}
+            font_size: {FONT_SIZE_BODY}
         
         BoxLayout:
             orientation: 'horizontal'
             size_hint_y: None
             height: dp(50)
-            spacing: app.theme.PADDING_MEDIUM
+            spacing: {PADDING_MEDIUM}
             
             Button:
                 text: 'Cancel'
                 size_hint_x: 0.5
-                background_color: app.theme.colors.LIGHT_GREY
-                color: app.theme.colors.DARK_GREY
-                font_name: app.theme.FONT_FAMILY_REGULAR
-                font_size: app.theme.FONT_SIZE_BODY
+                background_color: {LIGHT_GREY}
+                color: {DARK_GREY}
+                font_name: {FONT_FAMILY_REGULAR}
+                font_size: {FONT_SIZE_BODY}
                 on_release: root.dismiss()
             
             Button:
                 text: 'Add'
                 size_hint_x: 0.5
-                background_color: app.theme.colors.SWEDISH_BLUE
-                color: app.theme.colors.OFF_WHITE
-                font_name: app.theme.FONT_FAMILY_REGULAR
-                font_size: app.theme.FONT_SIZE_BODY
+                background_color: {SWEDISH_BLUE}
+                color: {OFF_WHITE}
+                font_name: {FONT_FAMILY_REGULAR}
+                font_size: {FONT_SIZE_BODY}
                 on_release: root.add_function()
 
 <AddParameterDialog>:
@@ -127,16 +143,16 @@ Builder.load_string('''
     
     BoxLayout:
         orientation: 'vertical'
-        padding: app.theme.PADDING_MEDIUM
-        spacing: app.theme.PADDING_MEDIUM
+        padding: {PADDING_MEDIUM}
+        spacing: {PADDING_MEDIUM}
         
         Label:
             text: 'Parameter Name:'
             size_hint_y: None
             height: dp(30)
-            color: app.theme.colors.DARK_GREY
-            font_name: app.theme.FONT_FAMILY_REGULAR
-            font_size: app.theme.FONT_SIZE_BODY
+            color: {DARK_GREY}
+            font_name: {FONT_FAMILY_REGULAR}
+            font_size: {FONT_SIZE_BODY}
             halign: 'left'
             text_size: self.size
         
@@ -145,16 +161,16 @@ Builder.load_string('''
             size_hint_y: None
             height: dp(40)
             multiline: False
-            font_name: app.theme.FONT_FAMILY_REGULAR
-            font_size: app.theme.FONT_SIZE_BODY
+            font_name: {FONT_FAMILY_REGULAR}
+            font_size: {FONT_SIZE_BODY}
         
         Label:
             text: 'Description:'
             size_hint_y: None
             height: dp(30)
-            color: app.theme.colors.DARK_GREY
-            font_name: app.theme.FONT_FAMILY_REGULAR
-            font_size: app.theme.FONT_SIZE_BODY
+            color: {DARK_GREY}
+            font_name: {FONT_FAMILY_REGULAR}
+            font_size: {FONT_SIZE_BODY}
             halign: 'left'
             text_size: self.size
         
@@ -163,64 +179,187 @@ Builder.load_string('''
             size_hint_y: None
             height: dp(80)
             multiline: True
-            font_name: app.theme.FONT_FAMILY_REGULAR
-            font_size: app.theme.FONT_SIZE_BODY
+            font_name: {FONT_FAMILY_REGULAR}
+            font_size: {FONT_SIZE_BODY}
         
         BoxLayout:
             orientation: 'horizontal'
             size_hint_y: None
             height: dp(50)
-            spacing: app.theme.PADDING_MEDIUM
+            spacing: {PADDING_MEDIUM}
             
             Button:
                 text: 'Cancel'
                 size_hint_x: 0.5
-                background_color: app.theme.colors.LIGHT_GREY
-                color: app.theme.colors.DARK_GREY
-                font_name: app.theme.FONT_FAMILY_REGULAR
-                font_size: app.theme.FONT_SIZE_BODY
+                background_color: {LIGHT_GREY}
+                color: {DARK_GREY}
+                font_name: {FONT_FAMILY_REGULAR}
+                font_size: {FONT_SIZE_BODY}
                 on_release: root.dismiss()
             
             Button:
                 text: 'Add'
                 size_hint_x: 0.5
-                background_color: app.theme.colors.SWEDISH_BLUE
-                color: app.theme.colors.OFF_WHITE
-                font_name: app.theme.FONT_FAMILY_REGULAR
-                font_size: app.theme.FONT_SIZE_BODY
+                background_color: {SWEDISH_BLUE}
+                color: {OFF_WHITE}
+                font_name: {FONT_FAMILY_REGULAR}
+                font_size: {FONT_SIZE_BODY}
                 on_release: root.add_parameter()
-''')
+'''
+
+# モジュールが再読み込みされても二重に解析しない
+KV_FILENAME = 'project_view.kv'
+if KV_FILENAME not in Builder.files:
+    Builder.load_string(KV.format(**SwedishMinimalistTheme.kv_constants()), filename=KV_FILENAME)
 
+KV_DIALOGS_FILENAME = 'project_view_dialogs.kv'
 
-class ProjectTreeLabel(TreeViewLabel):
-    """プロジェクトツリーのラベル"""
+
+def _load_dialogs_kv():
+    """ダイアログのKVを未読み込みの場合のみ読み込みます"""
+    if KV_DIALOGS_FILENAME not in Builder.files:
+        Builder.load_string(KV_DIALOGS.format(**SwedishMinimalistTheme.kv_constants()),
+                            filename=KV_DIALOGS_FILENAME)
+
+
+class ProjectTreeNode:
+    """
+    プロジェクトツリーのノード
+    
+    ウィジェットを持たないデータのみのノードです。表示は
+    ProjectViewが展開中のノードだけを行データに変換して行います。
+    """
+    
+    def __init__(self, text='', node_type='', node_id='', is_open=False):
+        self.text = text
+        self.node_type = node_type
+        self.node_id = node_id
+        self.is_open = is_open
+        self.parent_node = None
+        self.nodes = []
+
+
+class ProjectTreeLabel(RecycleDataViewBehavior, Label):
+    """プロジェクトツリーの1行を表示するラベル"""
     
     node_type = StringProperty('')
     node_id = StringProperty('')
+    indent = NumericProperty(0)
+    is_selected = BooleanProperty(False)
     
-    def __init__(self, **kwargs):
-        self.node_type = kwargs.pop('node_type', '')
-        self.node_id = kwargs.pop('node_id', '')
-        super(ProjectTreeLabel, self).__init__(**kwargs)
+    def refresh_view_attrs(self, rv, index, data):
+        """RecycleViewから行データが割り当てられたときに呼ばれます"""
+        self.index = index
+        self.project_view = rv
+        return super(ProjectTreeLabel, self).refresh_view_attrs(rv, index, data)
+    
+    def on_touch_down(self, touch):
+        """行がタッチされたときに選択・開閉を行います"""
+        if self.collide_point(*touch.pos):
+            self.project_view.select_row(self.index)
+            return True
+        return super(ProjectTreeLabel, self).on_touch_down(touch)
 
 
-class ProjectView(TreeView):
-    """プロジェクト構造を表示するツリービュー"""
+class ProjectView(RecycleView):
+    """
+    プロジェクト構造を表示するツリービュー
+    
+    RecycleViewを使用し、画面に表示されている行の分だけウィジェットを生成します。
+    ノードの追加・開閉時は次のフレームでまとめて行データを作り直します。
+    """
+    
+    # 階層ごとのインデント幅
+    INDENT_WIDTH = dp(20)
     
     def __init__(self, **kwargs):
         super(ProjectView, self).__init__(**kwargs)
         
-        # ルートノードの追加
-        self.root_node = self.add_node(ProjectTreeLabel(
+        # (関数ノード, セクション種別) -> セクションノード
+        self._section_index = {}
+        
+        # 表示中の行に対応するノード（self.dataと同じ順序）
+        self._visible_nodes = []
+        self.selected_node = None
+        self._refresh_trigger = Clock.create_trigger(self._refresh_data)
+        
+        # ルートノード（「Project」として最上位の行に表示する）
+        self.root_node = ProjectTreeNode(
             text='Project',
             node_type='project',
             node_id='root',
             is_open=True
-        ))
+        )
         
         # サンプルデータの追加（実際のアプリケーションでは動的に生成）
         self.add_sample_data()
     
+    def add_node(self, node, parent=None):
+        """
+        ノードを追加します。
+        
+        Args:
+            node: 追加するノード
+            parent: 親ノード（省略時はルートノード）
+            
+        Returns:
+            追加されたノード
+        """
+        parent = parent or self.root_node
+        node.parent_node = parent
+        parent.nodes.append(node)
+        self._refresh_trigger()
+        return node
+    
+    def toggle_node(self, node):
+        """
+        ノードの開閉を切り替えます。
+        
+        Args:
+            node: 開閉するノード
+        """
+        node.is_open = not node.is_open
+        self._refresh_trigger()
+    
+    def select_row(self, index):
+        """
+        表示中の行を選択します。子を持つノードは開閉も切り替えます。
+        
+        Args:
+            index: 行のインデックス
+        """
+        node = self._visible_nodes[index]
+        self.selected_node = node
+        if node.nodes:
+            node.is_open = not node.is_open
+        self._refresh_trigger()
+    
+    def _refresh_data(self, *args):
+        """展開中のノードを行データに変換します"""
+        visible_nodes = []
+        data = []
+        
+        def walk(nodes, level):
+            for node in nodes:
+                if node.nodes:
+                    prefix = '- ' if node.is_open else '+ '
+                else:
+                    prefix = '  '
+                visible_nodes.append(node)
+                data.append({
+                    'text': prefix + node.text,
+                    'node_type': node.node_type,
+                    'node_id': node.node_id,
+                    'indent': level * self.INDENT_WIDTH,
+                    'is_selected': node is self.selected_node,
+                })
+                if node.is_open:
+                    walk(node.nodes, level + 1)
+        
+        walk([self.root_node], 0)
+        self._visible_nodes = visible_nodes
+        self.data = data
+    
     def add_sample_data(self):
         """サンプルデータを追加します（デモ用）"""
         # サンプル関数の追加
@@ -252,7 +391,7 @@ class ProjectView(TreeView):
         parent = parent or self.root_node
         
         # 関数ノードの追加
-        function_node = self.add_node(ProjectTreeLabel(
+        function_node = self.add_node(ProjectTreeNode(
             text=f'{name}()',
             node_type='function',
             node_id=name,
@@ -260,7 +399,7 @@ class ProjectView(TreeView):
         ), parent)
         
         # 説明ノードの追加
-        self.add_node(ProjectTreeLabel(
+        self.add_node(ProjectTreeNode(
             text=f'Description: {description}',
             node_type='description',
             node_id=f'{name}_desc'
@@ -281,30 +420,26 @@ class ProjectView(TreeView):
             追加されたパラメータノード
         """
         # パラメータセクションの取得または作成
-        params_node = None
-        for node in self.iterate_all_nodes():
-            if (node.parent_node == function_node and 
-                getattr(node, 'node_type', '') == 'parameters'):
-                params_node = node
-                break
+        params_node = self._section_index.get((function_node, 'parameters'))
         
         if not params_node:
-            params_node = self.add_node(ProjectTreeLabel(
+            params_node = self.add_node(ProjectTreeNode(
                 text='Parameters',
                 node_type='parameters',
                 node_id=f'{function_node.node_id}_params',
                 is_open=True
             ), function_node)
+            self._section_index[(function_node, 'parameters')] = params_node
         
         # パラメータノードの追加
-        param_node = self.add_node(ProjectTreeLabel(
+        param_node = self.add_node(ProjectTreeNode(
             text=f'{name}',
             node_type='parameter',
             node_id=f'{function_node.node_id}_{name}'
         ), params_node)
         
         # 説明ノードの追加
-        self.add_node(ProjectTreeLabel(
+        self.add_node(ProjectTreeNode(
             text=f'Description: {description}',
             node_type='description',
             node_id=f'{function_node.node_id}_{name}_desc'
@@ -324,14 +459,15 @@ class ProjectView(TreeView):
             追加された戻り値ノード
         """
         # 戻り値ノードの追加
-        return_node = self.add_node(ProjectTreeLabel(
+        return_node = self.add_node(ProjectTreeNode(
             text='Returns',
             node_type='returns',
             node_id=f'{function_node.node_id}_returns'
         ), function_node)
+        self._section_index[(function_node, 'returns')] = return_node
         
         # 説明ノードの追加
-        self.add_node(ProjectTreeLabel(
+        self.add_node(ProjectTreeNode(
             text=f'Description: {description}',
             node_type='description',
             node_id=f'{function_node.node_id}_returns_desc'
@@ -351,14 +487,15 @@ class ProjectView(TreeView):
             追加されたロジックノード
         """
         # ロジックノードの追加
-        logic_node = self.add_node(ProjectTreeLabel(
+        logic_node = self.add_node(ProjectTreeNode(
             text='Logic',
             node_type='logic',
             node_id=f'{function_node.node_id}_logic'
         ), function_node)
+        self._section_index[(function_node, 'logic')] = logic_node
         
         # 説明ノードの追加
-        self.add_node(ProjectTreeLabel(
+        self.add_node(ProjectTreeNode(
             text=f'Description: {description}',
             node_type='description',
             node_id=f'{function_node.node_id}_logic_desc'
@@ -368,15 +505,17 @@ class ProjectView(TreeView):
     
     def clear_project(self):
         """プロジェクトツリーをクリアします"""
-        self.clear_widgets()
+        self._section_index.clear()
+        self.selected_node = None
         
-        # ルートノードの再追加
-        self.root_node = self.add_node(ProjectTreeLabel(
+        # ルートノードの作り直し
+        self.root_node = ProjectTreeNode(
             text='Project',
             node_type='project',
             node_id='root',
             is_open=True
-        ))
+        )
+        self._refresh_trigger()
 
 
 class AddFunctionDialog(Popup):
@@ -386,6 +525,7 @@ class AddFunctionDialog(Popup):
     parent_node = ObjectProperty(None)
     
     def __init__(self, project_view, parent_node=None, **kwargs):
+        _load_dialogs_kv()
         super(AddFunctionDialog, self).__init__(**kwargs)
         self.project_view = project_view
         self.parent_node = parent_node
@@ -407,6 +547,7 @@ class AddParameterDialog(Popup):
     function_node = ObjectProperty(None)
     
     def __init__(self, project_view, function_node, **kwargs):
+        _load_dialogs_kv()
         super(AddParameterDialog, self).__init__(**kwargs)
         self.project_view = project_view
         self.function_node = function_node
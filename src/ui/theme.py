@@ -10,38 +10,58 @@ from kivy.core.text import LabelBase
 from kivy.core.window import Window
 from kivy.utils import get_color_from_hex
 from kivy.metrics import dp, sp
-from kivy.core.text import LabelBase, DEFAULT_FONT
 from kivy.resources import resource_add_path
-from kivy.utils import platform
 import os
 
 
+# 16進数のカラーコード（大文字） -> RGBAタプル
+_COLOR_CACHE = {}
+
+
+def _color(hex_color):
+    """
+    16進数のカラーコードを変更不可のRGBAタプルに変換します。
+    
+    同じカラーコードには同じタプルのインスタンスを返します。
+    """
+    key = hex_color.upper()
+    color = _COLOR_CACHE.get(key)
+    if color is None:
+        color = _COLOR_CACHE[key] = tuple(get_color_from_hex(key))
+    return color
+
+
 # スウェーデン風ミニマリズムのカラーパレット
 class SwedishMinimalistColors:
-    """スウェーデン風ミニマリズムのカラーパレットを定義するクラス"""
+    """
+    スウェーデン風ミニマリズムのカラーパレットを定義するクラス
+    
+    値は実行中に変化しないため、タプルとして一度だけ生成します。
+    KVからは `#:import colors src.ui.theme.SwedishMinimalistColors` で参照します。
+    """
     
     # ベースカラー
-    OFF_WHITE = get_color_from_hex("#F9F9F9")
+    OFF_WHITE = _color("#F9F9F9")
     
     # テキスト
-    DARK_GREY = get_color_from_hex("#333333")
-    MEDIUM_GREY = get_color_from_hex("#666666")
+    DARK_GREY = _color("#333333")
+    MEDIUM_GREY = _color("#666666")
     
     # アクセント
-    SWEDISH_BLUE = get_color_from_hex("#006AA7")
-    SWEDISH_YELLOW = get_color_from_hex("#FECC02")
+    SWEDISH_BLUE = _color("#006AA7")
+    SWEDISH_YELLOW = _color("#FECC02")
     
     # 背景
-    LIGHT_GREY = get_color_from_hex("#F0F0F0")
+    LIGHT_GREY = _color("#F0F0F0")
     
     # セカンダリ
-    MEDIUM_LIGHT_GREY = get_color_from_hex("#CCCCCC")
+    MEDIUM_LIGHT_GREY = _color("#CCCCCC")
     
     # 状態表示
-    SUCCESS = get_color_from_hex("#4CAF50")
-    WARNING = get_color_from_hex("#FFC107")
-    ERROR = get_color_from_hex("#F44336")
-    INFO = get_color_from_hex("#2196F3")
+    SUCCESS = _color("#4CAF50")
+    WARNING = _color("#FFC107")
+    ERROR = _color("#F44336")
+    INFO = _color("#2196F3")
 
 
 class SwedishMinimalistTheme:
@@ -91,30 +111,61 @@ class SwedishMinimalistTheme:
     INPUT_HEIGHT = dp(36)
     TOOLBAR_HEIGHT = dp(48)
     
+    # 登録するフォント（フォント名の属性, フォントファイル名）
+    FONT_FILES = (
+        ("FONT_FAMILY_REGULAR", "Roboto-Black.ttf"),
+        ("FONT_FAMILY_LIGHT", "Roboto-Light.ttf"),
+        ("FONT_FAMILY_MEDIUM", "Roboto-Medium.ttf"),
+        ("FONT_FAMILY_BOLD", "Roboto-Bold.ttf"),
+        ("FONT_FAMILY_MONO", "RobotoMono-VariableFont_wght.ttf"),
+    )
+    
+    _theme_applied = False
+    
     @classmethod
     def apply_theme(cls):
-        """テーマをアプリケーションに適用します"""
+        """
+        テーマをアプリケーションに適用します。
+        
+        フォントの登録は最初の呼び出しでのみ行います。
+        """
         # ウィンドウの背景色を設定
         Window.clearcolor = cls.colors.OFF_WHITE
+        
+        if cls._theme_applied:
+            return
+        cls._theme_applied = True
+        
         font_path = os.path.join(os.path.dirname(__file__))
         resource_add_path(font_path)
         
-        # フォントの登録
+        # フォントの登録（1つのフォントの失敗が他のフォントに影響しないよう個別に登録）
         # 注: 実際のアプリケーションでは、フォントファイルが存在することを確認してください
-        try:
-            LabelBase.register(name=cls.FONT_FAMILY_REGULAR, 
-                              fn_regular="fonts/Roboto-Black.ttf")
-            LabelBase.register(name=cls.FONT_FAMILY_LIGHT, 
-                              fn_regular="fonts/Roboto-Light.ttf")
-            LabelBase.register(name=cls.FONT_FAMILY_MEDIUM, 
-                              fn_regular="fonts/Roboto-Medium.ttf")
-            LabelBase.register(name=cls.FONT_FAMILY_BOLD, 
-                              fn_regular="fonts/Roboto-Bold.ttf")
-            LabelBase.register(name=cls.FONT_FAMILY_MONO, 
-                              fn_regular="fonts/RobotoMono-VariableFont_wght.ttf")
-        except Exception as e:
-            print(f"フォント登録エラー: {e}")
-            print("デフォルトフォントを使用します")
+        for font_attr, file_name in cls.FONT_FILES:
+            try:
+                LabelBase.register(name=getattr(cls, font_attr),
+                                   fn_regular=os.path.join(font_path, "fonts", file_name))
+            except Exception as e:
+                print(f"フォント登録エラー: {e}")
+                print(f"{getattr(cls, font_attr)} はデフォルトフォントを使用します")
+    
+    @classmethod
+    def kv_constants(cls):
+        """
+        KV文字列に埋め込むためのテーマ定数を取得します。
+        
+        KVの `{FONT_SIZE_BODY}` や `{OFF_WHITE}` をstr.formatで置き換えると、
+        実行時に `app.theme` をたどらない定数の式になります。
+        
+        Returns:
+            定数名からKVの式への辞書
+        """
+        constants = {}
+        for source in (cls.colors, cls):
+            for name, value in vars(source).items():
+                if name.isupper():
+                    constants[name] = repr(value)
+        return constants
     
     @classmethod
     def get_button_style(cls, primary=True, outline=False):
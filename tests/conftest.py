@@ -0,0 +1,22 @@
+"""
+テスト共通の設定
+
+テスト対象のモジュール（src パッケージ）をインポートできるよう、
+リポジトリのルートを一度だけ sys.path に追加します。
+また、テスト間で共有するフィクスチャを定義します。
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+@pytest.fixture(scope="session")
+def shared_tmp(tmp_path_factory):
+    """セッション全体で共有する一時ディレクトリ（後片付けはpytestが行う）"""
+    return tmp_path_factory.mktemp("codegen")
@@ -10,9 +10,11 @@ import unittest
 import tempfile
 import json
 import time
+from unittest import mock
+
+import pytest
 
 # テスト対象のモジュールをインポート
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.core.agent_core import AgentManager, TaskPlanner, MemoryManager, ExecutionEngine, Task, TaskStatus
 
 
@@ -59,15 +61,12 @@ class TestTask(unittest.TestCase):
     def test_subtask_management(self):
         """サブタスク管理のテスト"""
         parent_task = Task("parent", "親タスク")
-        subtask1 = Task("sub1", "サブタスク1", "parent")
-        subtask2 = Task("sub2", "サブタスク2", "parent")
+        subtasks = [Task(f"sub{i}", f"サブタスク{i}", "parent") for i in (1, 2)]
         
-        parent_task.add_subtask(subtask1)
-        parent_task.add_subtask(subtask2)
+        for subtask in subtasks:
+            parent_task.add_subtask(subtask)
         
-        self.assertEqual(len(parent_task.subtasks), 2)
-        self.assertEqual(parent_task.subtasks[0].task_id, "sub1")
-        self.assertEqual(parent_task.subtasks[1].task_id, "sub2")
+        self.assertEqual([sub.task_id for sub in parent_task.subtasks], ["sub1", "sub2"])
     
     def test_task_serialization(self):
         """タスクのシリアライズとデシリアライズのテスト"""
@@ -88,12 +87,15 @@ class TestTask(unittest.TestCase):
         reconstructed_task = Task.from_dict(task_dict)
         
         # 検証
-        self.assertEqual(reconstructed_task.task_id, original_task.task_id)
-        self.assertEqual(reconstructed_task.description, original_task.description)
-        self.assertEqual(reconstructed_task.status, original_task.status)
-        self.assertEqual(reconstructed_task.result, original_task.result)
-        self.assertEqual(len(reconstructed_task.subtasks), 1)
-        self.assertEqual(reconstructed_task.subtasks[0].task_id, "sub")
+        expected = {
+            "task_id": "serialize",
+            "description": "シリアライズテスト",
+            "status": TaskStatus.COMPLETED,
+            "result": {"data": "テスト結果"},
+        }
+        actual = {key: getattr(reconstructed_task, key) for key in expected}
+        self.assertDictEqual(actual, expected)
+        self.assertEqual([sub.task_id for sub in reconstructed_task.subtasks], ["sub"])
 
 
 class TestTaskPlanner(unittest.TestCase):
@@ -206,10 +208,21 @@ class TestMemoryManager(unittest.TestCase):
 class TestExecutionEngine(unittest.TestCase):
     """ExecutionEngineクラスのテストケース"""
     
+    @classmethod
+    def setUpClass(cls):
+        """全テストで共有するMemoryManagerとExecutionEngineを一度だけ作成"""
+        cls.memory_manager = MemoryManager()
+        cls.execution_engine = ExecutionEngine(cls.memory_manager)
+    
     def setUp(self):
         """各テスト前の準備"""
-        self.memory_manager = MemoryManager()
-        self.execution_engine = ExecutionEngine(self.memory_manager)
+        # 実行経路の待機（リトライ時のsleepなど）で時間を消費しないようにする
+        sleep_patcher = mock.patch('src.core.agent_core.time.sleep', lambda *_: None)
+        sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+        
+        # 前のテストで登録したツールを残さない
+        self.execution_engine.tool_registry.clear()
     
     def test_task_handler_registration(self):
         """タスクハンドラ登録のテスト"""
@@ -322,6 +335,7 @@ class TestAgentManager(unittest.TestCase):
         self.assertEqual(status["description"], "状態テスト")
         self.assertIn("subtasks", status)
     
+    @pytest.mark.slow
     def test_save_and_load_state(self):
         """状態の保存と読み込みのテスト"""
         # 一時ディレクトリを使用
@@ -352,4 +366,4 @@ class TestAgentManager(unittest.TestCase):
 
 
 if __name__ == '__main__':
-    unittest.main()
+    sys.exit(pytest.main([__file__, "-n", "auto"]))
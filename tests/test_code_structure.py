@@ -2,31 +2,54 @@
 Code Structure Tools のテスト
 
 このモジュールはCode Structure Toolsの機能をテストします。
+assert文を使用していないため、pytestのアサーション書き換えは無効にしています。
+
+PYTEST_DONT_REWRITE
 """
 
+import copy
 import os
 import sys
 import unittest
 import tempfile
-import yaml
+import uuid
+
+import pytest
 
 # テスト対象のモジュールをインポート
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.tools.code_structure import CodeStructureManager
 
 
 class TestCodeStructureManager(unittest.TestCase):
     """CodeStructureManagerのテストクラス"""
     
+    test_project_name = "テストプロジェクト"
+    test_project_desc = "テスト用のプロジェクト"
+    
+    @classmethod
+    def setUpClass(cls):
+        """全テストで共有するプロジェクトを一度だけ作成"""
+        template = CodeStructureManager()
+        template.create_project(cls.test_project_name, cls.test_project_desc)
+        cls._template_project = template.project
+    
     def setUp(self):
-        """各テスト前の準備"""
+        """各テスト前の準備（共有プロジェクトの複製を使用）"""
         self.manager = CodeStructureManager()
-        self.test_project_name = "テストプロジェクト"
-        self.test_project_desc = "テスト用のプロジェクト"
+        self.manager.project = copy.deepcopy(self._template_project)
+    
+    @pytest.fixture(autouse=True)
+    def _use_shared_tmp(self, shared_tmp):
+        """セッション共有の一時ディレクトリをテストから参照できるようにする"""
+        self.shared_tmp = shared_tmp
+    
+    def _fresh(self):
+        """プロジェクトを作成していないマネージャーを取得"""
+        return CodeStructureManager()
     
     def test_create_project(self):
         """プロジェクト作成機能のテスト"""
-        project = self.manager.create_project(self.test_project_name, self.test_project_desc)
+        project = self._fresh().create_project(self.test_project_name, self.test_project_desc)
         
         self.assertEqual(project["name"], self.test_project_name)
         self.assertEqual(project["description"], self.test_project_desc)
@@ -35,8 +58,6 @@ class TestCodeStructureManager(unittest.TestCase):
     
     def test_add_function(self):
         """関数追加機能のテスト"""
-        self.manager.create_project(self.test_project_name, self.test_project_desc)
-        
         # トップレベル関数の追加
         func = self.manager.add_function("main", "メイン関数")
         
@@ -63,7 +84,6 @@ class TestCodeStructureManager(unittest.TestCase):
     
     def test_add_parameter(self):
         """パラメータ追加機能のテスト"""
-        self.manager.create_project(self.test_project_name, self.test_project_desc)
         self.manager.add_function("process_data", "データ処理関数")
         
         param = self.manager.add_parameter("process_data", "data", "処理するデータ")
@@ -78,7 +98,6 @@ class TestCodeStructureManager(unittest.TestCase):
     
     def test_add_return(self):
         """戻り値追加機能のテスト"""
-        self.manager.create_project(self.test_project_name, self.test_project_desc)
         self.manager.add_function("calculate", "計算関数")
         
         returns = self.manager.add_return("calculate", "計算結果")
@@ -91,7 +110,6 @@ class TestCodeStructureManager(unittest.TestCase):
     
     def test_add_logic(self):
         """ロジック追加機能のテスト"""
-        self.manager.create_project(self.test_project_name, self.test_project_desc)
         self.manager.add_function("validate", "検証関数")
         
         logic = self.manager.add_logic("validate", "入力データの検証を行う")
@@ -104,7 +122,6 @@ class TestCodeStructureManager(unittest.TestCase):
     
     def test_show_structure(self):
         """構造表示機能のテスト"""
-        self.manager.create_project(self.test_project_name, self.test_project_desc)
         self.manager.add_function("main", "メイン関数")
         self.manager.add_parameter("main", "args", "コマンドライン引数")
         self.manager.add_return("main", "終了コード")
@@ -116,9 +133,9 @@ class TestCodeStructureManager(unittest.TestCase):
         self.assertIn("args", structure)
         self.assertIn("終了コード", structure)
     
+    @pytest.mark.slow
     def test_save_and_load_yaml(self):
         """YAML保存・読み込み機能のテスト"""
-        self.manager.create_project(self.test_project_name, self.test_project_desc)
         self.manager.add_function("main", "メイン関数")
         
         # 一時ファイルにYAMLを保存
@@ -142,30 +159,31 @@ class TestCodeStructureManager(unittest.TestCase):
             if os.path.exists(yaml_path):
                 os.unlink(yaml_path)
     
+    @pytest.mark.slow
     def test_generate_code(self):
         """コード生成機能のテスト"""
-        self.manager.create_project(self.test_project_name, self.test_project_desc)
         self.manager.add_function("greet", "挨拶関数")
         self.manager.add_parameter("greet", "name", "名前")
         self.manager.add_return("greet", "挨拶メッセージ")
         self.manager.add_logic("greet", "名前を含む挨拶メッセージを返す")
         
-        # 一時ディレクトリにコードを生成
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generated_files = self.manager.generate_code(temp_dir)
-            
-            # 生成されたファイルの検証
-            self.assertEqual(len(generated_files), 1)
-            self.assertTrue(os.path.exists(generated_files[0]))
-            
-            # ファイル内容の検証
-            with open(generated_files[0], 'r') as f:
-                content = f.read()
-                self.assertIn(self.test_project_name, content)
-                self.assertIn("def greet", content)
-                self.assertIn("name", content)
-                self.assertIn("挨拶メッセージ", content)
+        # 共有の一時ディレクトリ内の専用ディレクトリにコードを生成（削除はpytestが行う）
+        output_dir = self.shared_tmp / uuid.uuid4().hex
+        output_dir.mkdir()
+        generated_files = self.manager.generate_code(str(output_dir))
+        
+        # 生成されたファイルの検証
+        self.assertEqual(len(generated_files), 1)
+        self.assertTrue(os.path.exists(generated_files[0]))
+        
+        # ファイル内容の検証
+        with open(generated_files[0], 'r') as f:
+            content = f.read()
+            self.assertIn(self.test_project_name, content)
+            self.assertIn("def greet", content)
+            self.assertIn("name", content)
+            self.assertIn("挨拶メッセージ", content)
 
 
 if __name__ == '__main__':
-    unittest.main()
+    sys.exit(pytest.main([__file__, "-n", "auto"]))
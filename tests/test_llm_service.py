@@ -4,35 +4,42 @@ LLM Service のテスト
 このモジュールはLLM Serviceの機能をテストします。
 """
 
-import os
+import copy
 import sys
 import unittest
-import tempfile
 import json
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, mock_open
 
-# テスト対象のモジュールをインポート
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+
+# テスト対象のモジュールをインポート（sys.pathはconftest.pyで設定済み）
 from src.services.llm_service import LLMConnector, PromptManager, ResponseParser, ContextManager, LLMService
 
 
 class TestLLMConnector(unittest.TestCase):
     """LLMConnectorのテストクラス"""
     
-    def setUp(self):
-        """各テスト前の準備"""
+    @classmethod
+    def setUpClass(cls):
+        """全テストで共有する準備"""
         # 環境変数をモック
-        self.env_patcher = patch.dict('os.environ', {
+        cls.env_patcher = patch.dict('os.environ', {
             'OPENAI_API_KEY': 'test_api_key',
             'OPENAI_API_BASE': 'https://test-api.example.com/v1',
             'OPENAI_MODEL': 'test-model'
         })
-        self.env_patcher.start()
-        self.connector = LLMConnector()
+        cls.env_patcher.start()
+        cls.addClassCleanup(cls.env_patcher.stop)
+        
+        # HTTPリクエストをモック
+        cls._post_patcher = patch('requests.Session.post')
+        cls.mock_post = cls._post_patcher.start()
+        cls.addClassCleanup(cls._post_patcher.stop)
     
-    def tearDown(self):
-        """各テスト後の後処理"""
-        self.env_patcher.stop()
+    def setUp(self):
+        """各テスト前の準備（ヘッダーを変更するテストがあるため、コネクタは毎回作成する）"""
+        self.connector = LLMConnector()
+        self.mock_post.reset_mock()
     
     def test_initialization(self):
         """初期化のテスト"""
@@ -51,9 +58,10 @@ class TestLLMConnector(unittest.TestCase):
         self.connector.set_api_base_url('https://new-api.example.com/v1')
         self.assertEqual(self.connector.api_base_url, 'https://new-api.example.com/v1')
     
-    @patch('requests.Session.post')
-    def test_chat_completion(self, mock_post):
+    def test_chat_completion(self):
         """チャット補完APIのテスト"""
+        mock_post = self.mock_post
+        
         # モックレスポンスの設定
         mock_response = MagicMock()
         mock_response.json.return_value = {
@@ -84,17 +92,16 @@ class TestLLMConnector(unittest.TestCase):
 class TestPromptManager(unittest.TestCase):
     """PromptManagerのテストクラス"""
     
-    def setUp(self):
-        """各テスト前の準備"""
-        # 一時ディレクトリを使用
-        self.temp_dir = tempfile.mkdtemp()
-        self.prompt_manager = PromptManager(self.temp_dir)
+    @pytest.fixture(autouse=True, scope="class")
+    def _create_base_prompt_manager(self, request, tmp_path_factory):
+        """デフォルトテンプレートの作成を一度だけ行う（並列実行でもワーカーごとに別ディレクトリ）"""
+        temp_dir = tmp_path_factory.mktemp("prompt_manager")
+        request.cls._base_prompt_manager = PromptManager(str(temp_dir))
     
-    def tearDown(self):
-        """各テスト後の後処理"""
-        # 一時ディレクトリを削除
-        import shutil
-        shutil.rmtree(self.temp_dir)
+    def setUp(self):
+        """各テスト前の準備（テンプレートの辞書は複製して共有を避ける）"""
+        self.prompt_manager = copy.copy(self._base_prompt_manager)
+        self.prompt_manager.templates = dict(self._base_prompt_manager.templates)
     
     def test_default_templates(self):
         """デフォルトテンプレートのテスト"""
@@ -280,37 +287,40 @@ class TestContextManager(unittest.TestCase):
         self.context_manager.add_message('system', 'システム指示')
         self.context_manager.add_message('user', 'ユーザー指示')
         
-        # 一時ファイルに保存
-        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as temp:
-            file_path = temp.name
+        # ディスクの代わりにメモリ上に保存
+        save_open = mock_open()
+        with patch('builtins.open', save_open):
+            self.context_manager.save_conversation('conversation.json')
+        written = ''.join(c.args[0] for c in save_open().write.call_args_list)
         
-        try:
-            self.context_manager.save_conversation(file_path)
-            
-            # 新しいコンテキストマネージャーで読み込み
-            new_context = ContextManager()
-            new_context.load_conversation(file_path)
-            
-            messages = new_context.get_conversation_messages()
-            
-            self.assertEqual(len(messages), 2)
-            self.assertEqual(messages[0]['role'], 'system')
-            self.assertEqual(messages[0]['content'], 'システム指示')
-        finally:
-            # テスト後に一時ファイルを削除
-            if os.path.exists(file_path):
-                os.unlink(file_path)
+        # 新しいコンテキストマネージャーで読み込み
+        new_context = ContextManager()
+        with patch('builtins.open', mock_open(read_data=written)):
+            new_context.load_conversation('conversation.json')
+        
+        messages = new_context.get_conversation_messages()
+        
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(messages[0]['role'], 'system')
+        self.assertEqual(messages[0]['content'], 'システム指示')
 
 
 class TestLLMService(unittest.TestCase):
     """LLMServiceのテストクラス"""
     
+    @classmethod
+    def setUpClass(cls):
+        """全テストで共有する準備"""
+        # LLMConnectorをモック
+        cls.connector_patcher = patch('src.services.llm_service.LLMConnector')
+        cls.mock_connector_class = cls.connector_patcher.start()
+        cls.addClassCleanup(cls.connector_patcher.stop)
+        cls.mock_connector = cls.mock_connector_class.return_value
+    
     def setUp(self):
         """各テスト前の準備"""
-        # LLMConnectorをモック
-        self.connector_patcher = patch('src.services.llm_service.LLMConnector')
-        self.mock_connector_class = self.connector_patcher.start()
-        self.mock_connector = self.mock_connector_class.return_value
+        # 前のテストの呼び出し記録を消去
+        self.mock_connector_class.reset_mock()
         
         # モックレスポンスの設定
         self.mock_connector.chat_completion.return_value = {
@@ -325,10 +335,6 @@ class TestLLMService(unittest.TestCase):
         
         self.llm_service = LLMService()
     
-    def tearDown(self):
-        """各テスト後の後処理"""
-        self.connector_patcher.stop()
-    
     def test_generate_code(self):
         """コード生成のテスト"""
         # ResponseParserをモック
@@ -390,4 +396,4 @@ class TestLLMService(unittest.TestCase):
 
 
 if __name__ == '__main__':
-    unittest.main()
+    sys.exit(pytest.main([__file__, "-n", "auto"]))
@@ -4,26 +4,39 @@ UI コンポーネントのテスト
 このモジュールはKivyベースのUIコンポーネントの機能をテストします。
 """
 
+import io
 import os
 import sys
 import unittest
+from contextlib import ExitStack
 from unittest.mock import patch, MagicMock
 
-# テスト対象のモジュールをインポート
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
 
-# Kivyのウィンドウを表示せずにテストするための設定
-os.environ['KIVY_NO_ARGS'] = '1'
-os.environ['KIVY_NO_CONSOLELOG'] = '1'
+# Kivyのウィンドウを表示せずにテストするための設定（Kivyのインポートより前に行う）
+os.environ.update({
+    'KIVY_GL_BACKEND': 'mock',
+    'KIVY_NO_ARGS': '1',
+    'KIVY_NO_CONSOLELOG': '1',
+})
 
-# Kivyのウィンドウを表示せずにテストするためのモック
-from kivy.core.window import Window
-Window.size = (800, 600)
+# ウィンドウはインポート時に生成せず、サイズは設定で指定する
+from kivy.config import Config
+Config.set('graphics', 'width', '800')
+Config.set('graphics', 'height', '600')
 
 # テスト対象のモジュールをインポート
+from kivy.uix.widget import Widget
 from src.ui.main_app import ProjectView, CodeEditor, OutputConsole, ManusAgentUI, ManusAgentApp
 
 
+class _StubWidget(Widget):
+    """KivyMDウィジェットの代わりに使う軽量なスタブ（引数は無視する）"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+
+
 class TestProjectView(unittest.TestCase):
     """ProjectViewクラスのテストケース"""
     
@@ -58,21 +71,36 @@ class TestCodeEditor(unittest.TestCase):
         self.assertEqual(self.code_editor.file_label.text, "ファイル: なし")
         self.assertIsNone(self.code_editor.current_file)
     
-    @patch('builtins.open', new_callable=unittest.mock.mock_open, read_data='test code')
-    @patch('os.path.exists', return_value=True)
-    def test_load_file(self, mock_exists, mock_open):
+    # mock_openではなく実際のファイルオブジェクトと同じように振る舞うBytesIOを返す
+    @patch('builtins.open', side_effect=lambda *args, **kwargs: io.BytesIO(b'test code'))
+    @patch('os.path.getsize', return_value=len(b'test code'))
+    def test_load_file(self, mock_getsize, mock_open):
         """ファイル読み込みのテスト"""
         self.code_editor.load_file('/test/path/file.py')
         
-        mock_exists.assert_called_once_with('/test/path/file.py')
-        mock_open.assert_called_once_with('/test/path/file.py', 'r')
+        mock_getsize.assert_called_once_with('/test/path/file.py')
+        mock_open.assert_called_once_with('/test/path/file.py', 'rb', buffering=0)
         self.assertEqual(self.code_editor.code_input.text, 'test code')
         self.assertEqual(self.code_editor.current_file, '/test/path/file.py')
         self.assertEqual(self.code_editor.file_label.text, "ファイル: file.py")
     
-    @patch('builtins.open', new_callable=unittest.mock.mock_open)
-    @patch('kivymd.toast.toast')
-    def test_save_file(self, mock_toast, mock_open):
+    @patch('os.path.getsize', side_effect=FileNotFoundError)
+    def test_load_missing_file(self, mock_getsize):
+        """存在しないファイル読み込みのテスト"""
+        self.code_editor.load_file('/test/path/missing.py')
+        
+        self.assertIsNone(self.code_editor.current_file)
+        self.assertEqual(self.code_editor.code_input.text, '')
+    
+    @patch('tempfile.mkstemp', return_value=(3, '/test/path/.file.py1a2b.tmp'))
+    @patch('os.write', side_effect=lambda fd, data: len(data))
+    @patch('os.close')
+    @patch('os.fsync')
+    @patch('shutil.copymode')
+    @patch('os.replace')
+    @patch('src.ui.main_app.toast')
+    def test_save_file(self, mock_toast, mock_replace, mock_copymode, mock_fsync,
+                       mock_close, mock_write, mock_mkstemp):
         """ファイル保存のテスト"""
         # 現在のファイルを設定
         self.code_editor.current_file = '/test/path/file.py'
@@ -81,8 +109,13 @@ class TestCodeEditor(unittest.TestCase):
         # 保存を実行
         self.code_editor.save_file()
         
-        mock_open.assert_called_once_with('/test/path/file.py', 'w')
-        mock_open().write.assert_called_once_with('updated code')
+        # 一時ファイルは保存先と同じディレクトリに一意な名前で作成される
+        mock_mkstemp.assert_called_once_with(dir='/test/path', prefix='.file.py', suffix='.tmp')
+        mock_write.assert_called_once()
+        self.assertEqual(bytes(mock_write.call_args[0][1]), 'updated code'.encode('utf-8'))
+        mock_fsync.assert_called_once_with(3)
+        mock_close.assert_called_once_with(3)
+        mock_replace.assert_called_once_with('/test/path/.file.py1a2b.tmp', '/test/path/file.py')
         mock_toast.assert_called_once()
 
 
@@ -101,9 +134,11 @@ class TestOutputConsole(unittest.TestCase):
     def test_append_output(self):
         """出力追加のテスト"""
         self.output_console.append_output("テスト出力1")
+        self.output_console.flush()
         self.assertEqual(self.output_console.console_output.text, "テスト出力1\n")
         
         self.output_console.append_output("テスト出力2")
+        self.output_console.flush()
         self.assertEqual(self.output_console.console_output.text, "テスト出力1\nテスト出力2\n")
     
     def test_clear_console(self):
@@ -116,12 +151,26 @@ class TestOutputConsole(unittest.TestCase):
 class TestManusAgentUI(unittest.TestCase):
     """ManusAgentUIクラスのテストケース"""
     
+    @classmethod
+    def setUpClass(cls):
+        """ウィジェットの構築は重いため、全テストで1つのUIを共有する"""
+        stack = ExitStack()
+        cls.addClassCleanup(stack.close)
+        # AgentManagerとCodeStructureManagerをモック
+        stack.enter_context(patch('src.ui.main_app.AgentManager'))
+        stack.enter_context(patch('src.ui.main_app.CodeStructureManager'))
+        # 検証に使わないツールバーとボタンはKivyMDのウィジェットを構築しない
+        stack.enter_context(patch('src.ui.main_app.MDTopAppBar', _StubWidget))
+        stack.enter_context(patch('src.ui.main_app.MDRaisedButton', _StubWidget))
+        # main_appがインポート時に束縛したtoastを置き換える
+        cls.mock_toast = stack.enter_context(patch('src.ui.main_app.toast'))
+        cls.ui = ManusAgentUI()
+    
     def setUp(self):
         """各テスト前の準備"""
-        # AgentManagerとCodeStructureManagerをモック
-        with patch('src.ui.main_app.AgentManager'), \
-             patch('src.ui.main_app.CodeStructureManager'):
-            self.ui = ManusAgentUI()
+        self.mock_toast.reset_mock()
+        # 前のテストで生成されたファイルマネージャーを破棄
+        self.ui.file_manager = None
     
     def test_initialization(self):
         """初期化のテスト"""
@@ -132,19 +181,27 @@ class TestManusAgentUI(unittest.TestCase):
         self.assertIsNotNone(self.ui.project_view)
         self.assertIsNotNone(self.ui.code_editor)
         self.assertIsNotNone(self.ui.output_console)
-        self.assertIsNotNone(self.ui.file_manager)
+        # ファイルマネージャーは初回表示時に生成される
+        self.assertIsNone(self.ui.file_manager)
+    
+    @patch('kivymd.uix.filemanager.MDFileManager')
+    def test_show_file_manager(self, mock_file_manager):
+        """ファイルマネージャー表示のテスト"""
+        self.ui.show_file_manager()
+        self.ui.show_file_manager()
+        
+        mock_file_manager.assert_called_once()
+        self.assertEqual(mock_file_manager.return_value.show.call_count, 2)
     
-    @patch('kivymd.toast.toast')
-    def test_show_settings(self, mock_toast):
+    def test_show_settings(self):
         """設定表示のテスト"""
         self.ui.show_settings()
-        mock_toast.assert_called_once()
+        self.mock_toast.assert_called_once()
     
-    @patch('kivymd.toast.toast')
-    def test_show_help(self, mock_toast):
+    def test_show_help(self):
         """ヘルプ表示のテスト"""
         self.ui.show_help()
-        mock_toast.assert_called_once()
+        self.mock_toast.assert_called_once()
     
     @patch('src.ui.main_app.CodeStructureManager.create_project')
     def test_create_new_project(self, mock_create_project):
@@ -152,19 +209,16 @@ class TestManusAgentUI(unittest.TestCase):
         # モックの戻り値を設定
         mock_create_project.return_value = {"name": "サンプルプロジェクト"}
         
-        # ProjectViewのupdate_project_viewをモック
-        self.ui.project_view.update_project_view = MagicMock()
-        
-        # OutputConsoleのappend_outputをモック
-        self.ui.output_console.append_output = MagicMock()
-        
-        # テスト実行
-        self.ui.create_new_project(None)
+        # 共有のUIに影響を残さないよう、ProjectViewとOutputConsoleはテスト中だけモック
+        with patch.object(self.ui.project_view, 'update_project_view') as mock_update, \
+             patch.object(self.ui.output_console, 'append_output') as mock_append:
+            # テスト実行
+            self.ui.create_new_project(None)
         
         # 検証
         mock_create_project.assert_called_once_with("サンプルプロジェクト", "サンプルプロジェクトの説明")
-        self.ui.project_view.update_project_view.assert_called_once()
-        self.ui.output_console.append_output.assert_called_once()
+        mock_update.assert_called_once()
+        mock_append.assert_called_once()
     
     @patch('os.makedirs')
     @patch('src.ui.main_app.CodeStructureManager.generate_code')
@@ -173,20 +227,17 @@ class TestManusAgentUI(unittest.TestCase):
         # モックの戻り値を設定
         mock_generate_code.return_value = ["/path/to/generated/file.py"]
         
-        # OutputConsoleのappend_outputをモック
-        self.ui.output_console.append_output = MagicMock()
-        
-        # CodeEditorのload_fileをモック
-        self.ui.code_editor.load_file = MagicMock()
-        
-        # テスト実行
-        self.ui.generate_code(None)
+        # 共有のUIに影響を残さないよう、OutputConsoleとCodeEditorはテスト中だけモック
+        with patch.object(self.ui.output_console, 'append_output') as mock_append, \
+             patch.object(self.ui.code_editor, 'load_file') as mock_load_file:
+            # テスト実行
+            self.ui.generate_code(None)
         
         # 検証
         mock_makedirs.assert_called_once()
         mock_generate_code.assert_called_once()
-        self.ui.output_console.append_output.assert_called()
-        self.ui.code_editor.load_file.assert_called_once_with("/path/to/generated/file.py")
+        mock_append.assert_called()
+        mock_load_file.assert_called_once_with("/path/to/generated/file.py")
 
 
 class TestManusAgentApp(unittest.TestCase):
@@ -212,4 +263,4 @@ class TestManusAgentApp(unittest.TestCase):
 
 
 if __name__ == '__main__':
-    unittest.main()
+    sys.exit(pytest.main([__file__]))